@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Sample-size advisor: estimates, for every (solution, configuration,
+benchmark), how many more runs are needed for the median and the p99 to be
+known within a target relative error, and writes a run plan ordered by how
+far each cell still is from that target.
+
+The relative error at the current sample count n is the half-width of the
+bootstrap percentile CI divided by the estimate. It shrinks as 1/sqrt(n), so
+the required count is n * (error / target)^2. A tail quantile q only
+stops being the observed maximum after 1 / (1 - q) samples; this count is
+reported as its own column (p99_min_runs) and only enforced on series too
+short (fewer than 2 samples) to bootstrap at all.
+
+The estimated board time of a cell is its extra runs times its median
+execution time plus a per-run overhead (cell offlining, create, destroy and
+cache flush). The overhead is either given with --overhead-ms or measured
+from UART logs with lifecycle.py (--logs): the median turnaround minus the
+execution time of each (configuration, benchmark), and the median over all
+iterations for the cells the logs do not cover. All times are in
+milliseconds.
+
+Examples:
+    python advisor.py --target-median 0.01 --target-p99 0.05 --overhead-ms 1500
+    python advisor.py --logs ../ZIC-APU/*uart_log*.txt
+"""
+import math
+import argparse
+import csv
+import numpy as np
+
+from lifecycle import derive_latencies, parse_lifecycle
+from sample_store import load_samples, solutions
+from significance import bootstrap_batches, bootstrap_statistics
+from tail_stats import collect_series, pad_series
+
+# Run plan written by default, next to the solution directories.
+default_output = '../run_plan.csv'
+
+# Quantiles the advisor checks, by name.
+quantiles = {'median': 0.5, 'p99': 0.99}
+
+# Default target relative error of each quantile.
+default_targets = {'median': 0.01, 'p99': 0.05}
+
+# Upper bound of the runs planned for a single cell.
+default_max_runs = 10000
+
+def relative_errors(matrix, counts, resamples, confidence, rng):
+    """Bootstrap CI half-width / estimate of the median and p99 of every row."""
+    tail = (1 - confidence) / 2 * 100
+    errors = {name: np.empty(len(matrix)) for name in quantiles}
+    for batch in bootstrap_batches(counts, resamples):
+        resampled = dict(zip(quantiles, bootstrap_statistics(matrix[batch], counts[batch], resamples, rng)))
+        for name, values in resampled.items():
+            low, center, high = np.percentile(values, [tail, 50, 100 - tail], axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                errors[name][batch] = np.nan_to_num((high - low) / 2 / np.abs(center))
+    return errors
+
+def minimum_runs(q):
+    """Sample count from which the empirical quantile q is no longer just the maximum."""
+    return math.ceil(1 / (1 - q)) if q > 0.5 else 0
+
+def required_runs(counts, error, target, q):
+    """
+    Total sample count at which a quantile reaches the target relative error.
+    Series too short to bootstrap need at least minimum_runs(q), and 2.
+    """
+    scaled = np.ceil(counts * (error / target) ** 2)
+    return np.where(counts < 2, max(minimum_runs(q), 2), scaled).astype(np.int64)
+
+def overheads_from_logs(log_paths):
+    """
+    Per-run board time besides the benchmark itself (ms), from the cell
+    lifecycle of UART logs: {(configuration, benchmark): median} and the
+    median over all iterations, or ({}, nan) when no iteration is complete.
+    """
+    groups = {}
+    for log_path in log_paths:
+        for record in parse_lifecycle(log_path):
+            record = derive_latencies(record)
+            if record['benchmark'] is not None and record['execution_ns'] is not None:
+                overhead = record['turnaround'] - record['execution_ns'] / 1e6
+                if not np.isnan(overhead):
+                    groups.setdefault((record['config'], record['benchmark']), []).append(overhead)
+    if not groups:
+        return {}, np.nan
+    overall = float(np.median(np.concatenate([np.array(v) for v in groups.values()])))
+    return {key: float(np.median(values)) for key, values in groups.items()}, overall
+
+def plan_runs(data, overhead_ms, targets=default_targets, resamples=1000, confidence=0.95,
+              max_runs=default_max_runs, seed=0, cell_overheads=None):
+    """
+    Returns one row dict per series, most unstable first. overhead_ms is the
+    per-run overhead of the cells missing from cell_overheads, a dict
+    {(configuration, benchmark): ms} as returned by overheads_from_logs.
+    """
+    cell_overheads = cell_overheads or {}
+    keys, series = collect_series(data)
+    if not keys:
+        return []
+    matrix = pad_series(series)
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    errors = relative_errors(matrix, counts, resamples, confidence, np.random.default_rng(seed))
+    required = {name: np.minimum(required_runs(counts, errors[name], targets[name], q), max_runs)
+                for name, q in quantiles.items()}
+    extra = np.maximum(np.maximum(*required.values()) - counts, 0)
+    median = np.nanmedian(matrix, axis=1)
+    cv = np.nanstd(matrix, axis=1) / np.nanmean(matrix, axis=1)
+
+    rows = []
+    for row, (sol_name, config, bench) in enumerate(keys):
+        record = {'solution': sol_name, 'configuration': config, 'benchmark': bench,
+                  'count': int(counts[row]), 'median': median[row], 'cv': cv[row]}
+        for name in quantiles:
+            record[f"{name}_rel_error"] = errors[name][row]
+            record[f"{name}_required"] = int(required[name][row])
+        record['p99_min_runs'] = minimum_runs(quantiles['p99'])
+        record['extra_runs'] = int(extra[row])
+        record['overhead_ms'] = cell_overheads.get((config, bench), overhead_ms)
+        record['board_time_s'] = extra[row] * (median[row] + record['overhead_ms']) / 1e3
+        record['instability'] = max(errors[name][row] / targets[name] for name in quantiles)
+        rows.append(record)
+    rows.sort(key=lambda r: (r['extra_runs'] == 0, -r['instability']))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate how many more runs each benchmark needs.")
+    parser.add_argument('--target-median', type=float, default=default_targets['median'],
+                        help="target relative error of the median")
+    parser.add_argument('--target-p99', type=float, default=default_targets['p99'],
+                        help="target relative error of the p99")
+    parser.add_argument('--max-runs', type=int, default=default_max_runs,
+                        help="upper bound of the total runs planned for one cell")
+    parser.add_argument('--resamples', type=int, default=1000, help="bootstrap resamples per series")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level of the CIs")
+    overhead = parser.add_mutually_exclusive_group(required=True)
+    overhead.add_argument('--overhead-ms', type=float,
+                          help="fixed board time per run besides the benchmark itself")
+    overhead.add_argument('--logs', nargs='+', metavar='UART_LOG',
+                          help="measure the per-run overhead from the cell lifecycle in these logs")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the bootstrap generator")
+    parser.add_argument('--top', type=int, default=20, help="number of plan entries to print")
+    parser.add_argument('--output', default=default_output, help="CSV file to write")
+    args = parser.parse_args()
+
+    targets = {'median': args.target_median, 'p99': args.target_p99}
+    cell_overheads, overhead_ms = {}, args.overhead_ms
+    if args.logs:
+        cell_overheads, overhead_ms = overheads_from_logs(args.logs)
+        if np.isnan(overhead_ms):
+            parser.error("no complete cell lifecycle in the logs; give --overhead-ms instead")
+        print(f"Per-run overhead measured on {len(cell_overheads)} cells, median {overhead_ms:.1f} ms")
+    rows = plan_runs(load_samples(solutions), overhead_ms, targets, args.resamples, args.confidence,
+                     args.max_runs, args.seed, cell_overheads)
+    if not rows:
+        print("No samples found.")
+        return
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        for record in rows:
+            writer.writerow({k: (f"{v:.6g}" if isinstance(v, float) else v) for k, v in record.items()})
+
+    pending = [r for r in rows if r['extra_runs']]
+    print(f"{len(pending)} of {len(rows)} series need more runs "
+          f"(median within {args.target_median:.1%}, p99 within {args.target_p99:.1%}); "
+          f"estimated board time {sum(r['board_time_s'] for r in pending) / 3600:.2f} h. "
+          f"Plan written to {args.output}")
+    for r in pending[:args.top]:
+        print(f"  {r['solution']:<12}{r['configuration']:<10}{r['benchmark']:<16}"
+              f"+{r['extra_runs']:<7d}median {r['median_rel_error']:6.2%}  p99 {r['p99_rel_error']:6.2%}  "
+              f"{r['board_time_s']:8.1f} s")
+
+if __name__ == "__main__":
+    main()
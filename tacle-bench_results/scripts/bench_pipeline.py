@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the analysis pipeline itself on a synthetic campaign.
+
+A campaign of the requested size (solutions x configurations x benchmarks x
+samples) is generated in a scratch directory laid out like this one, in the
+two formats of the real campaigns: even solutions as Jailhouse UART logs
+(<solution>/<config>_uart_log*.txt, one full cell lifecycle per run, ns
+times), odd ones as Preempt-RT result files
+(<solution>/<config>/<benchmark>_execution_time.txt, times in seconds).
+Every stage then runs in its own Python process, in pipeline order, so its
+import time and peak memory (max RSS) are its own; ingest and parse also run,
+untimed, when only later stages are selected:
+
+    ingest      logs -> <config>/<benchmark>_results.txt (ingest.py)
+    lifecycle   cell lifecycle latencies of every logged run (lifecycle.py)
+    parse       text files -> samples.npz (sample_store.py)
+    stats       per-file statistics from a cold stats_cache.json
+    sketch      quantile sketches of every series, rebuilt from the text files
+    tail_stats  tail-latency table of every series
+    density     KDE curves of every series (density.py)
+    plot_<type> one graph.py plot type for --plot-benchmarks benchmarks
+    compare     solution comparison figures for the same benchmarks
+    overview    the suite-wide overview figures
+    report      the self-contained HTML report
+
+With --profile each stage also runs under cProfile; the .prof files are kept
+next to the results and the top functions are added to the record. Every run
+is appended to a JSON history (--output) together with the parameters, the
+library versions and the git commit, and the timings are printed next to
+those of the previous run with the same parameters.
+
+Example:
+    python bench_pipeline.py --size medium --profile
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+
+# History of the runs, appended to by every run.
+default_output = '../pipeline_bench.json'
+
+# Campaign sizes: solutions, configurations, benchmarks, samples per series.
+size_presets = {
+    'small': {'solutions': 2, 'configs': 3, 'benchmarks': 10, 'samples': 100},
+    'medium': {'solutions': 2, 'configs': 6, 'benchmarks': 30, 'samples': 400},
+    'large': {'solutions': 2, 'configs': 6, 'benchmarks': 50, 'samples': 2000},
+}
+
+# Names of the generated configurations, as in the real campaigns.
+config_names = ['baseline', 'cpu8', 'fork8', 'memcpy8', 'open8', 'udp8']
+
+# The samples of one configuration are spread over this many logs.
+logs_per_config = 2
+
+# Plot types of graph.py; each is timed as its own stage.
+plot_stage_types = ['standard', 'box', 'violin', 'cdf', 'exceedance']
+
+stage_names = (['ingest', 'lifecycle', 'parse', 'stats', 'sketch', 'tail_stats', 'density']
+               + [f"plot_{t}" for t in plot_stage_types] + ['compare', 'overview', 'report'])
+
+# Stages every other stage needs; run untimed when not selected.
+prerequisite_stages = ['ingest', 'parse']
+
+# Modules each stage imports; their import time is reported apart from the stage time.
+stage_modules = {
+    'ingest': ['ingest'],
+    'lifecycle': ['lifecycle'],
+    'parse': ['sample_store'],
+    'stats': ['stats_cache'],
+    'sketch': ['sketch'],
+    'tail_stats': ['tail_stats'],
+    'density': ['density'],
+    'compare': ['compare_graphs'],
+    'overview': ['overview'],
+    'report': ['report'],
+}
+
+# Number of functions of a profile kept in the record, by cumulative time.
+profile_top = 15
+
+# One run of the inmate on the board, as printed on the UART (from ZIC-APU/cpu8_uart_log.txt).
+run_template = (
+    '[{t0:12.6f}] psci: CPU0 killed (polled 0 ms)\n'
+    'Created cell "inmate-demo-APU"\n'
+    '[{t1:12.6f}] Created Jailhouse cell "inmate-demo-APU"\n'
+    'Cell "inmate-demo-APU" can be loaded\n'
+    'Started cell "inmate-demo-APU"\n'
+    'Benchmark {bench} execution time:  {ns} ns\n'
+    'Closing cell "inmate-demo-APU"\n'
+    '[{t2:12.6f}] Detected VIPT I-cache on CPU0\n'
+    '[{t3:12.6f}] cacheinfo: Unable to detect cache hierarchy for CPU 0\n'
+    '[{t4:12.6f}] CPU0: Booted secondary processor 0x0000000000 [0x410fd034]\n'
+    '[{t5:12.6f}] Destroyed Jailhouse cell "inmate-demo-APU"\n'
+    '[{t6:12.6f}] external_script (18931): drop_caches: 3\n'
+)
+
+# Kernel timestamps of a run relative to its CPU0 offlining (s), as in the same log.
+run_offsets = {'t1': 0.0153, 't2': 2.3953, 't3': 2.39535, 't4': 2.3954, 't5': 2.3995, 't6': 2.5654}
+
+def campaign_configs(n_configs):
+    return config_names[:n_configs] + [f"stress{i}" for i in range(len(config_names), n_configs)]
+
+def log_name(config, part):
+    """uart_log.txt, udp8_uart_log2.txt, ... as named on the capture host."""
+    prefix = '' if config == 'baseline' else f"{config}_"
+    return f"{prefix}uart_log{part if part > 1 else ''}.txt"
+
+def synthetic_times(rng, base_ns, n):
+    """Log-normal jitter around base_ns with about 1% of slow outliers."""
+    times = base_ns * rng.lognormal(0, 0.02, n)
+    spikes = rng.random(n) < 0.01
+    times[spikes] *= rng.uniform(1.2, 2.0, np.count_nonzero(spikes))
+    return np.rint(times).astype(np.int64)
+
+def write_uart_logs(sol_dir, config, runs, rng):
+    """Writes (benchmark, ns) runs as the UART logs of one configuration; returns their size."""
+    clock = 300.0 + np.cumsum(rng.uniform(4.5, 5.5, len(runs)))
+    log_bytes = 0
+    for part, chunk in enumerate(np.array_split(np.arange(len(runs)), logs_per_config), 1):
+        path = os.path.join(sol_dir, log_name(config, part))
+        with open(path, 'w') as f:
+            f.write(''.join(run_template.format(t0=clock[i], bench=runs[i][0], ns=runs[i][1],
+                                                **{k: clock[i] + dt for k, dt in run_offsets.items()})
+                            for i in chunk))
+        log_bytes += os.path.getsize(path)
+    return log_bytes
+
+def write_result_files(sol_dir, config, runs):
+    """Writes (benchmark, ns) runs as Preempt-RT <benchmark>_execution_time.txt files (s); returns their size."""
+    config_dir = os.path.join(sol_dir, config)
+    os.makedirs(config_dir, exist_ok=True)
+    per_bench = {}
+    for bench, ns in runs:
+        per_bench.setdefault(bench, []).append(f"{ns / 1e9:.6f}\n")
+    result_bytes = 0
+    for bench, lines in per_bench.items():
+        path = os.path.join(config_dir, f"{bench}_execution_time.txt")
+        with open(path, 'w') as f:
+            f.write(''.join(lines))
+        result_bytes += os.path.getsize(path)
+    return result_bytes
+
+def generate_campaign(root, solutions=2, configs=3, benchmarks=10, samples=100, seed=0):
+    """
+    Writes a synthetic campaign under root: UART logs for the even solutions,
+    result files in seconds for the odd ones. Benchmarks run one after the
+    other, each for all its samples, and the runs of a configuration are
+    split over logs_per_config logs.
+    Returns {solution name: directory} and the total size of the logs and
+    of the result files in bytes.
+    """
+    rng = np.random.default_rng(seed)
+    bench_names = [f"bench{j:03d}" for j in range(benchmarks)]
+    base_ns = np.exp(rng.uniform(np.log(1e3), np.log(1e8), benchmarks))
+    sols = {}
+    log_bytes = result_bytes = 0
+    for s in range(solutions):
+        sol_dir = os.path.join(root, f"solution{s}")
+        os.makedirs(sol_dir, exist_ok=True)
+        sols[f"solution{s}"] = sol_dir
+        for c, config in enumerate(campaign_configs(configs)):
+            runs = [(bench, ns) for j, bench in enumerate(bench_names)
+                    for ns in synthetic_times(rng, base_ns[j] * (1 + 0.05 * c + 0.1 * s), samples)]
+            if s % 2 == 0:
+                log_bytes += write_uart_logs(sol_dir, config, runs, rng)
+            else:
+                result_bytes += write_result_files(sol_dir, config, runs)
+    return sols, log_bytes, result_bytes
+
+def campaign_logs(sols):
+    """{solution directory: its UART logs} of the solutions captured as logs."""
+    logs = {sol_dir: sorted(glob.glob(os.path.join(sol_dir, '*uart_log*.txt'))) for sol_dir in sols.values()}
+    return {sol_dir: paths for sol_dir, paths in logs.items() if paths}
+
+def stage_ingest(sols, configs, plot_benchmarks, work_dir):
+    from ingest import ingest_logs
+    logs = 0
+    for sol_dir, sol_logs in campaign_logs(sols).items():
+        ingest_logs(sol_logs, sol_dir)
+        logs += len(sol_logs)
+    return logs
+
+def stage_lifecycle(sols, configs, plot_benchmarks, work_dir):
+    from lifecycle import derive_latencies, parse_lifecycle, summarize
+    records = [derive_latencies(r) for sol_logs in campaign_logs(sols).values()
+               for log_path in sol_logs for r in parse_lifecycle(log_path)]
+    summarize(records)
+    return len(records)
+
+def stage_parse(sols, configs, plot_benchmarks, work_dir):
+    from sample_store import open_store, store_path
+    series = 0
+    for sol_dir in sols.values():
+        if os.path.exists(store_path(sol_dir)):
+            os.remove(store_path(sol_dir))
+        with open_store(sol_dir) as store:
+            series += len(store.files) - 1
+    return series
+
+def stage_stats(sols, configs, plot_benchmarks, work_dir):
+    from stats_cache import cache_filename, cached_statistics
+    series = 0
+    for sol_dir in sols.values():
+        if os.path.exists(os.path.join(sol_dir, cache_filename)):
+            os.remove(os.path.join(sol_dir, cache_filename))
+        series += sum(len(b) for b in cached_statistics(sol_dir, configs).values())
+    return series
+
+def stage_sketch(sols, configs, plot_benchmarks, work_dir):
+    from sketch import sketch_suffix, solution_sketches
+    for path in glob.glob(os.path.join(work_dir, '*', '*', f"*{sketch_suffix}")):
+        os.remove(path)
+    return sum(len(b) for sol_dir in sols.values() for b in solution_sketches(sol_dir, configs).values())
+
+def stage_tail_stats(sols, configs, plot_benchmarks, work_dir):
+    from sample_store import load_samples
+    from tail_stats import compute_tail_stats
+    return len(compute_tail_stats(load_samples(sols, configs)))
+
+def stage_density(sols, configs, plot_benchmarks, work_dir):
+    from density import build_density_cache
+    from sample_store import get_store
+    return sum(len(build_density_cache(sol_dir, get_store(sol_dir))) for sol_dir in sols.values())
+
+def plot_stage(plot_type):
+    """The stage drawing one graph.py plot type for the first plot_benchmarks benchmarks."""
+    def stage(sols, configs, plot_benchmarks, work_dir):
+        import graph
+        from density import solution_curves
+        from sample_store import load_solution
+        figures = 0
+        for sol_dir in sols.values():
+            graph.set_solution(sol_dir)
+            os.makedirs(graph.plot_types[plot_type], exist_ok=True)
+            solution_data = load_solution(sol_dir, configs)
+            solution_curves(sol_dir)
+            for bench in sorted(solution_data[configs[0]])[:plot_benchmarks]:
+                data, labels = graph.gather_benchmark_data(bench, solution_data)
+                graph.plot_functions[plot_type](bench, data, labels)
+                figures += 1
+        return figures
+    return stage
+
+def stage_compare(sols, configs, plot_benchmarks, work_dir):
+    import compare_graphs
+    compare_graphs.set_solutions(sols, configs, os.path.join(work_dir, 'compare_plots'))
+    benches = sorted(compare_graphs.list_all_benchmarks())[:plot_benchmarks]
+    compare_graphs.render_comparison(benches, configs, jobs=1, force=True)
+    return len(benches) * len(compare_graphs.plot_functions)
+
+def stage_overview(sols, configs, plot_benchmarks, work_dir):
+    from overview import plot_functions, render_overviews
+    render_overviews(sols, configs, os.path.join(work_dir, 'overview_plots'), jobs=1, force=True)
+    return len(configs) * len(plot_functions)
+
+def stage_report(sols, configs, plot_benchmarks, work_dir):
+    from report import build_report_data, write_report
+    from sample_store import load_samples
+    report_data = build_report_data(load_samples(sols, configs), sols)
+    write_report(report_data, os.path.join(work_dir, 'report.html'))
+    return len(report_data['series'])
+
+stage_functions = dict(
+    {'ingest': stage_ingest, 'lifecycle': stage_lifecycle, 'parse': stage_parse, 'stats': stage_stats, 'sketch': stage_sketch,
+     'tail_stats': stage_tail_stats,
+     'density': stage_density, 'compare': stage_compare, 'overview': stage_overview, 'report': stage_report},
+    **{f"plot_{t}": plot_stage(t) for t in plot_stage_types})
+
+def peak_rss_kib():
+    import resource
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def profile_summary(profile, top=profile_top):
+    """The top functions of a cProfile run by cumulative time."""
+    import pstats
+    stats = pstats.Stats(profile)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [{'function': f"{os.path.basename(file)}:{line}({name})", 'calls': calls,
+             'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)}
+            for (file, line, name), (_, calls, tottime, cumtime, _) in rows]
+
+def run_stage(stage, work_dir, plot_benchmarks, profile_path=None):
+    """Runs one stage in this process and returns its measurements."""
+    import importlib
+    with open(os.path.join(work_dir, 'campaign.json')) as f:
+        campaign = json.load(f)
+    start = time.perf_counter()
+    for module in stage_modules.get(stage, ['graph']):
+        importlib.import_module(module)
+    import_seconds = time.perf_counter() - start
+    rss_before = peak_rss_kib()
+
+    args = (campaign['solutions'], campaign['configurations'], plot_benchmarks, work_dir)
+    profile = None
+    if profile_path:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+    start = time.perf_counter()
+    items = stage_functions[stage](*args)
+    seconds = time.perf_counter() - start
+    result = {'seconds': round(seconds, 6), 'import_seconds': round(import_seconds, 6),
+              'items': items, 'seconds_per_item': round(seconds / items, 6) if items else None,
+              'rss_before_kib': rss_before, 'peak_rss_kib': peak_rss_kib()}
+    if profile is not None:
+        profile.disable()
+        profile.dump_stats(profile_path)
+        result['profile'] = profile_path
+        result['top_functions'] = profile_summary(profile_path)
+    return result
+
+def measure_stage(stage, work_dir, plot_benchmarks, profile_dir=None, verbose=False):
+    """Runs one stage in a fresh interpreter; returns its measurements, or the error."""
+    result_path = os.path.join(work_dir, f"{stage}.result.json")
+    command = [sys.executable, os.path.abspath(__file__), '--run-stage', stage, '--work-dir', work_dir,
+               '--plot-benchmarks', str(plot_benchmarks), '--result-file', result_path]
+    if profile_dir:
+        command += ['--profile-file', os.path.join(profile_dir, f"{stage}.prof")]
+    env = dict(os.environ, MPLBACKEND='Agg')
+    completed = subprocess.run(command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                               stdout=None if verbose else subprocess.DEVNULL)
+    if completed.returncode != 0 or not os.path.exists(result_path):
+        return {'error': f"exit status {completed.returncode}"}
+    with open(result_path) as f:
+        return json.load(f)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def environment():
+    import matplotlib
+    return {'host': platform.node(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__, 'git_commit': git_commit()}
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save_history(path, history):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+
+def print_run(record, previous=None):
+    """Stage table of a run, with the change of each time against the previous comparable run."""
+    print(f"{'stage':<16}{'seconds':>10}{'import s':>10}{'items':>8}{'peak MiB':>10}  change")
+    for stage, result in record['stages'].items():
+        if 'error' in result:
+            print(f"{stage:<16}  failed ({result['error']})")
+            continue
+        change = ''
+        old = (previous or {}).get('stages', {}).get(stage, {})
+        if old.get('seconds'):
+            change = f"{result['seconds'] / old['seconds'] - 1:+.1%}"
+        print(f"{stage:<16}{result['seconds']:>10.3f}{result['import_seconds']:>10.3f}"
+              f"{result['items']:>8}{result['peak_rss_kib'] / 1024:>10.1f}  {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every stage of the analysis pipeline on synthetic data.")
+    parser.add_argument('--size', choices=list(size_presets), default='small', help="campaign size preset")
+    parser.add_argument('--solutions', type=int, help="number of solutions (overrides the preset)")
+    parser.add_argument('--configs', type=int, help="number of configurations (overrides the preset)")
+    parser.add_argument('--benchmarks', type=int, help="number of benchmarks (overrides the preset)")
+    parser.add_argument('--samples', type=int, help="samples per series (overrides the preset)")
+    parser.add_argument('--plot-benchmarks', type=int, default=5,
+                        help="benchmarks drawn by the plot and compare stages")
+    parser.add_argument('--stages', nargs='+', choices=stage_names, default=stage_names,
+                        help="stages to run, in pipeline order (default: all)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic campaign")
+    parser.add_argument('--profile', action='store_true', help="also run every stage under cProfile")
+    parser.add_argument('--work-dir', help="new or empty directory for the campaign, kept afterwards "
+                                           "(default: a temporary one, removed)")
+    parser.add_argument('--output', default=default_output, help="JSON history to append the run to")
+    parser.add_argument('--verbose', action='store_true', help="show the output of the stages")
+    # Internal: run a single stage in this process (used by the child processes).
+    parser.add_argument('--run-stage', choices=stage_names, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    parser.add_argument('--profile-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        result = run_stage(args.run_stage, args.work_dir, args.plot_benchmarks, args.profile_file)
+        with open(args.result_file, 'w') as f:
+            json.dump(result, f)
+        return
+
+    # Profiled runs are slower, so they are only compared with other profiled runs.
+    parameters = dict(size_presets[args.size], plot_benchmarks=args.plot_benchmarks, seed=args.seed,
+                      profile=args.profile)
+    for name in ('solutions', 'configs', 'benchmarks', 'samples'):
+        if getattr(args, name) is not None:
+            parameters[name] = getattr(args, name)
+    if args.work_dir and os.path.isdir(args.work_dir) and os.listdir(args.work_dir):
+        sys.exit(f"{args.work_dir} is not empty; the campaign needs a new or empty directory")
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix='pipeline_bench_'))
+    os.makedirs(work_dir, exist_ok=True)
+    profile_dir = None
+    if args.profile:
+        profile_dir = os.path.join(os.path.dirname(os.path.abspath(args.output)), 'pipeline_profiles',
+                                   time.strftime('%Y%m%d-%H%M%S'))
+        os.makedirs(profile_dir, exist_ok=True)
+
+    try:
+        start = time.perf_counter()
+        sols, log_bytes, result_bytes = generate_campaign(work_dir, parameters['solutions'], parameters['configs'],
+                                            parameters['benchmarks'], parameters['samples'], args.seed)
+        generate_seconds = time.perf_counter() - start
+        with open(os.path.join(work_dir, 'campaign.json'), 'w') as f:
+            json.dump({'solutions': sols, 'configurations': campaign_configs(parameters['configs'])}, f)
+        n_samples = (parameters['solutions'] * parameters['configs']
+                     * parameters['benchmarks'] * parameters['samples'])
+        print(f"Generated {n_samples} samples in {log_bytes / 2**20:.1f} MiB of logs and "
+              f"{result_bytes / 2**20:.1f} MiB of result files ({generate_seconds:.1f} s) under {work_dir}")
+
+        stages = {}
+        for stage in stage_names:
+            if stage in args.stages:
+                stages[stage] = measure_stage(stage, work_dir, args.plot_benchmarks, profile_dir, args.verbose)
+            elif stage in prerequisite_stages:
+                measure_stage(stage, work_dir, args.plot_benchmarks, None, args.verbose)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    record = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'parameters': parameters,
+              'dataset': {'samples': n_samples, 'log_bytes': log_bytes, 'result_bytes': result_bytes}, 'environment': environment(),
+              'stages': stages}
+    history = load_history(args.output)
+    previous = next((r for r in reversed(history) if r['parameters'] == parameters), None)
+    print_run(record, previous)
+    history.append(record)
+    save_history(args.output, history)
+    print(f"Run appended to {args.output}" + (f", profiles in {profile_dir}" if profile_dir else ""))
+
+if __name__ == "__main__":
+    main()
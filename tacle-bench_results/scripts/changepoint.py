@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Warm-up, level-shift and autocorrelation detection over the sample order of
+every (solution, configuration, benchmark) series, vectorized over the
+whole NaN-padded matrix of series.
+
+  - warm-up: the longest prefix (at most max_warmup_fraction of the run)
+    ending with a sample outside median +- band * MAD of the rest of the run
+  - level shift: the CUSUM change point of the warm-up-trimmed series, with
+    the p-value of its standardized maximum under the Brownian bridge
+  - autocorrelation: lag-1..max_lag sample autocorrelation
+
+Annotations are written to a JSON file; graph.py --annotate overlays them
+on the standard plots and tail_stats.py --trim-warmup drops the unstable
+prefixes before computing statistics.
+
+Example:
+    python changepoint.py --max-lag 5 --alpha 0.01
+"""
+import argparse
+import json
+import numpy as np
+
+from pwcet import kolmogorov_sf
+from sample_store import load_samples, solutions
+from tail_stats import collect_series, pad_series
+
+# Annotations written by default, next to the solution directories.
+default_output = '../changepoints.json'
+
+# Detection parameters.
+max_warmup_fraction = 0.2
+band = 5.0
+change_alpha = 0.01
+
+def detect_warmup(matrix, counts, warmup_fraction=max_warmup_fraction, band_width=band):
+    """Number of leading samples to discard in every row."""
+    width = matrix.shape[1]
+    idx = np.arange(width)[None, :]
+    limit = np.floor(counts * warmup_fraction).astype(np.int64)
+    # Reference level and spread from the samples after the warm-up window.
+    tail = np.where(idx >= limit[:, None], matrix, np.nan)
+    with np.errstate(all='ignore'):
+        median = np.nanmedian(tail, axis=1)
+        mad = np.nanmedian(np.abs(tail - median[:, None]), axis=1)
+    # MAD is 0 on quantized series: fall back to a relative band.
+    spread = np.where(mad > 0, mad, np.abs(median) * 1e-3)
+    outside = np.abs(matrix - median[:, None]) > band_width * spread[:, None]
+    in_window = outside & (idx < limit[:, None])
+    last_outside = width - 1 - np.argmax(in_window[:, ::-1], axis=1)
+    return np.where(in_window.any(axis=1), last_outside + 1, 0)
+
+def trim_rows(matrix, counts, warmup):
+    """Shifts every row left by its warm-up length (NaN padding at the end)."""
+    width = matrix.shape[1]
+    idx = np.arange(width)[None, :] + warmup[:, None]
+    shifted = np.take_along_axis(matrix, np.minimum(idx, width - 1), axis=1)
+    return np.where(idx < counts[:, None], shifted, np.nan), counts - warmup
+
+def detect_level_shift(matrix, counts):
+    """
+    CUSUM change point of every row: index of the first sample after the
+    shift, p-value, and the median level before and after it.
+    """
+    valid = ~np.isnan(matrix)
+    mean = np.nanmean(matrix, axis=1)
+    centered = np.where(valid, matrix - mean[:, None], 0.0)
+    cusum = np.cumsum(centered, axis=1)
+    std = np.sqrt((centered ** 2).sum(axis=1) / np.maximum(counts - 1, 1))
+    # Only split points strictly inside the series.
+    split_ok = np.arange(matrix.shape[1])[None, :] < (counts - 1)[:, None]
+    magnitude = np.where(split_ok, np.abs(cusum), -1.0)
+    change = np.argmax(magnitude, axis=1) + 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = magnitude.max(axis=1) / (std * np.sqrt(counts))
+    p_value = np.where(std > 0, kolmogorov_sf(np.nan_to_num(statistic)), 1.0)
+    idx = np.arange(matrix.shape[1])[None, :]
+    with np.errstate(all='ignore'):
+        before = np.nanmedian(np.where(idx < change[:, None], matrix, np.nan), axis=1)
+        after = np.nanmedian(np.where(idx >= change[:, None], matrix, np.nan), axis=1)
+    return change, p_value, before, after
+
+def autocorrelation(matrix, counts, max_lag):
+    """Lag-1..max_lag sample autocorrelation of every row, shape (rows, max_lag)."""
+    valid = ~np.isnan(matrix)
+    centered = np.where(valid, matrix - np.nanmean(matrix, axis=1)[:, None], 0.0)
+    denominator = (centered ** 2).sum(axis=1)
+    acf = np.zeros((len(matrix), max_lag))
+    for lag in range(1, max_lag + 1):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            acf[:, lag - 1] = (centered[:, lag:] * centered[:, :-lag]).sum(axis=1) / denominator
+    return np.nan_to_num(acf)
+
+def detect_changes(series, max_lag=5, alpha=change_alpha):
+    """Annotations (one dict per series) for a list of arrays."""
+    matrix = pad_series(series)
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    warmup = detect_warmup(matrix, counts)
+    trimmed, trimmed_counts = trim_rows(matrix, counts, warmup)
+    change, p_value, before, after = detect_level_shift(trimmed, trimmed_counts)
+    acf = autocorrelation(trimmed, trimmed_counts, max_lag)
+    bound = 1.96 / np.sqrt(np.maximum(trimmed_counts, 1))
+    annotations = []
+    for row in range(len(series)):
+        shift = bool(p_value[row] < alpha)
+        annotations.append({
+            'count': int(counts[row]),
+            'warmup': int(warmup[row]),
+            # Indices are in the original (untrimmed) sample order.
+            'level_shift': int(warmup[row] + change[row]) if shift else None,
+            'level_shift_p': float(p_value[row]),
+            'level_before': float(before[row]),
+            'level_after': float(after[row]),
+            'acf': [round(float(v), 4) for v in acf[row]],
+            'autocorrelated': bool(np.any(np.abs(acf[row]) > bound[row])),
+        })
+    return annotations
+
+def trim_warmup(series):
+    """Returns the series with their detected warm-up prefix removed."""
+    if not series:
+        return []
+    matrix = pad_series(series)
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    warmup = detect_warmup(matrix, counts)
+    return [np.asarray(s)[w:] for s, w in zip(series, warmup)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect warm-up, level shifts and autocorrelation.")
+    parser.add_argument('--max-lag', type=int, default=5, help="highest autocorrelation lag")
+    parser.add_argument('--alpha', type=float, default=change_alpha, help="significance of a level shift")
+    parser.add_argument('--output', default=default_output, help="JSON file to write")
+    args = parser.parse_args()
+
+    keys, series = collect_series(load_samples(solutions))
+    if not keys:
+        print("No samples found.")
+        return
+    annotations = detect_changes(series, args.max_lag, args.alpha)
+    result = {'/'.join(key): annotation for key, annotation in zip(keys, annotations)}
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=1)
+    print(f"Annotations for {len(keys)} series written to {args.output}: "
+          f"{sum(a['warmup'] > 0 for a in annotations)} with warm-up, "
+          f"{sum(a['level_shift'] is not None for a in annotations)} with a level shift, "
+          f"{sum(a['autocorrelated'] for a in annotations)} autocorrelated")
+
+if __name__ == "__main__":
+    main()
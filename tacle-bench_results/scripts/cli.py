@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the result pipeline:
+
+    python cli.py ingest ../ZIC-APU/udp8_uart_log*.txt
+    python cli.py stats [--tail ../tail_stats.csv]
+    python cli.py plot [--jobs 0] [--annotate]
+    python cli.py compare [--bench mpeg2 fft]
+    python cli.py overview [--reference ZIC-APU]
+    python cli.py report [--output ../report.html]
+    python cli.py shards [--alpha 0.01]
+    python cli.py --exclude-shard 'udp8_uart_log3*' plot
+
+Solutions are the sub-directories of --root (by default the directory above
+this script) that hold configuration folders with sample files, and their
+configurations are the folders found in them; --solution and --config
+restrict or override both. --include-shard and --exclude-shard restrict
+every stage to the samples of some capture sessions (see shards.py). All
+paths are explicit, so the command works from any directory. The analysis
+modules, and matplotlib in particular, are only imported by the subcommand
+that needs them.
+"""
+import os
+import sys
+import argparse
+
+# Results root: the directory holding the solution directories.
+default_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_solution(spec):
+    """"NAME=PATH" or "PATH" (named after its directory) -> (name, absolute path)."""
+    name, sep, path = spec.partition('=')
+    if not sep:
+        path = spec
+        name = os.path.basename(os.path.normpath(spec))
+    return name, os.path.abspath(path)
+
+def selected_solutions(args):
+    from sample_store import discover_solutions
+    if args.solution:
+        sols = dict(parse_solution(spec) for spec in args.solution)
+    else:
+        sols = discover_solutions(args.root)
+    if not sols:
+        sys.exit(f"No solution directories found under {args.root}")
+    return sols
+
+def selected_configurations(args, sols):
+    """
+    Configurations given with --config, otherwise the union of the discovered
+    ones; with --from-sketches, folders holding only sketches count too.
+    """
+    if args.config:
+        return args.config
+    if getattr(args, 'from_sketches', False):
+        from sketch import sketch_configurations as discover_configurations
+    else:
+        from sample_store import discover_configurations
+    configs = []
+    for sol_dir in sols.values():
+        configs += [c for c in discover_configurations(sol_dir) if c not in configs]
+    return configs
+
+def run_ingest(args):
+    from ingest import ingest_logs
+    out_dir = args.out_dir or os.path.dirname(os.path.abspath(args.logs[0]))
+    ingest_logs(args.logs, out_dir, config=args.ingest_config, mark_only=args.mark_only)
+
+def solution_statistics(sol_dir, configs, from_sketches=False):
+    """
+    Cached per-file statistics, those of the selected shards computed from
+    the store, or those of the quantile sketches (approximate medians).
+    """
+    import sample_store
+    from stats_cache import cached_statistics, calculate_statistics
+    if from_sketches:
+        from sketch import solution_sketches
+        return {config: {bench: sketch.statistics() for bench, sketch in benches.items()}
+                for config, benches in solution_sketches(sol_dir, configs).items()}
+    if sample_store.shard_selection is None:
+        return cached_statistics(sol_dir, configs)
+    return {config: {bench: calculate_statistics(sample_store.ns_to_ms(exec_times))
+                     for bench, exec_times in benches.items()}
+            for config, benches in sample_store.load_solution(sol_dir, configs).items()}
+
+def run_stats(args):
+    sols = selected_solutions(args)
+    configs = selected_configurations(args, sols)
+    for sol_name, sol_dir in sols.items():
+        for config, benches in solution_statistics(sol_dir, configs, args.from_sketches).items():
+            for bench, s in sorted(benches.items()):
+                print(f"{sol_name}/{config}/{bench} - Mean: {s['mean']:.6f} ms, Median: {s['median']:.6f} ms, "
+                      f"Std Dev: {s['std_dev']:.6f} ms, Min: {s['min']:.6f} ms, Max: {s['max']:.6f} ms")
+    if args.tail:
+        from sample_store import load_samples
+        from tail_stats import compute_tail_stats, write_table
+        rows = compute_tail_stats(load_samples(sols, configs), trim_warmup=args.trim_warmup)
+        if rows:
+            write_table(rows, args.tail)
+            print(f"Tail statistics for {len(rows)} series written to {args.tail}")
+
+def run_plot(args):
+    from graph import render_solution
+    from render_pool import default_jobs
+    sols = selected_solutions(args)
+    configs = selected_configurations(args, sols)
+    for sol_name, sol_dir in sols.items():
+        print(f"Rendering plots of {sol_name} ({sol_dir})")
+        render_solution(sol_dir, configs, args.jobs or default_jobs(), args.force, args.annotate,
+                        args.from_sketches)
+
+def run_compare(args):
+    import compare_graphs
+    from render_pool import default_jobs
+    sols = selected_solutions(args)
+    configs = selected_configurations(args, sols)
+    plots_dir = args.out_dir or os.path.join(args.root, 'compare_plots')
+    if args.config:
+        plots_dir = compare_graphs.selection_plots_dir(plots_dir, configs)
+    compare_graphs.set_solutions(sols, configs, plots_dir)
+    compare_graphs.render_comparison(args.bench, configs, args.jobs or default_jobs(), args.force)
+
+def run_overview(args):
+    from overview import render_overviews
+    from render_pool import default_jobs
+    sols = selected_solutions(args)
+    if args.reference and args.reference not in sols:
+        args.error(f"argument --reference: {args.reference!r} is not one of the selected solutions "
+                   f"({', '.join(sols)})")
+    render_overviews(sols, selected_configurations(args, sols),
+                     args.out_dir or os.path.join(args.root, 'overview_plots'), args.reference,
+                     args.jobs or default_jobs(), args.force)
+
+def run_report(args):
+    from report import build_report_data, write_report
+    from sample_store import load_samples
+    sols = selected_solutions(args)
+    configs = selected_configurations(args, sols)
+    report_data = build_report_data(load_samples(sols, configs), sols)
+    if not report_data['series']:
+        print("No samples found.")
+        return
+    output = args.output or os.path.join(args.root, 'report.html')
+    write_report(report_data, output)
+    print(f"Report of {len(report_data['series'])} series written to {output}")
+
+def run_shards(args):
+    import csv
+    from shards import session_summary, shard_consistency
+    sols = selected_solutions(args)
+    rows = shard_consistency(sols, selected_configurations(args, sols), args.alpha)
+    if not rows:
+        print("No series with provenance from two or more shards.")
+        return
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    for s in session_summary(rows):
+        print(f"{s['solution']}/{s['shard']}: shifted in {s['shifted']} of {s['benchmarks']} benchmarks, "
+              f"median delta {s['median_delta']:+.2f}{'  FLAGGED' if s['flagged'] else ''}")
+
+def add_render_options(parser):
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of worker processes (0 = one per CPU core)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render every figure even if its inputs did not change")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Ingest, analyse and plot benchmark execution times.")
+    parser.add_argument('--root', default=default_root,
+                        help="directory holding the solution directories (default: %(default)s)")
+    parser.add_argument('--solution', action='append',
+                        help="solution directory as NAME=PATH or PATH; repeatable (default: discovered)")
+    parser.add_argument('--config', action='append',
+                        help="configuration to include; repeatable (default: discovered)")
+    parser.add_argument('--include-shard', action='append', metavar='PATTERN',
+                        help="only use samples of the shards (sessions) matching this glob; repeatable")
+    parser.add_argument('--exclude-shard', action='append', metavar='PATTERN',
+                        help="drop the samples of the shards matching this glob; repeatable")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="extract execution times from UART logs")
+    ingest.add_argument('logs', nargs='+', help="UART log files to ingest")
+    ingest.add_argument('--out-dir', help="solution directory holding the configuration folders "
+                                          "(default: the directory of the first log)")
+    ingest.add_argument('--config', dest='ingest_config',
+                        help="configuration for all logs (default: derived from each log name)")
+    ingest.add_argument('--mark-only', action='store_true',
+                        help="record the current end of each log without writing samples")
+    ingest.set_defaults(run=run_ingest)
+
+    stats = commands.add_parser('stats', help="print cached per-benchmark statistics")
+    stats.add_argument('--tail', metavar='CSV', help="also write the tail-latency table to this file")
+    stats.add_argument('--trim-warmup', action='store_true',
+                       help="drop the detected warm-up prefix before the tail statistics")
+    stats.add_argument('--from-sketches', action='store_true',
+                       help="summarize the quantile sketches instead of the samples")
+    stats.set_defaults(run=run_stats)
+
+    plot = commands.add_parser('plot', help="render the per-solution figures")
+    add_render_options(plot)
+    plot.add_argument('--annotate', action='store_true',
+                      help="mark detected warm-up and level shifts on the standard plots")
+    plot.add_argument('--from-sketches', action='store_true',
+                      help="draw the box, violin and CDF plots from the quantile sketches only")
+    plot.set_defaults(run=run_plot)
+
+    compare = commands.add_parser('compare', help="render the solution comparison figures")
+    add_render_options(compare)
+    compare.add_argument('--bench', nargs='+', help="only these benchmarks (default: all)")
+    compare.add_argument('--out-dir', help="directory for the figures (default: <root>/compare_plots)")
+    compare.set_defaults(run=run_compare)
+
+    overview = commands.add_parser('overview', help="render the suite-wide small-multiples figures")
+    add_render_options(overview)
+    overview.add_argument('--reference', help="normalize every solution to this solution's baseline median")
+    overview.add_argument('--out-dir', help="directory for the figures (default: <root>/overview_plots)")
+    # The reference can only be checked once the solutions are discovered, in run_overview.
+    overview.set_defaults(run=run_overview, error=overview.error)
+
+    report = commands.add_parser('report', help="write the interactive HTML report")
+    report.add_argument('--output', help="HTML file to write (default: <root>/report.html)")
+    report.set_defaults(run=run_report)
+
+    shards = commands.add_parser('shards', help="compare the capture sessions of every benchmark")
+    shards.add_argument('--alpha', type=float, default=0.01, help="significance level after correction")
+    shards.add_argument('--output', metavar='CSV', help="also write the per-shard table to this file")
+    shards.set_defaults(run=run_shards)
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    args.root = os.path.abspath(args.root)
+    if args.include_shard or args.exclude_shard:
+        from sample_store import select_shards
+        select_shards(args.include_shard, args.exclude_shard)
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
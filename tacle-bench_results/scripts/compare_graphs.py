@@ -1,115 +1,62 @@
 import os
-import re
+import argparse
+import functools
+from render_pool import default_jobs, render_stale_figures, report_failures
 import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 
-# Define the two solutions and their corresponding base directories.
-solutions = {
-    "Preempt-RT": "../Preempt-RT-containers",
-    "ZIC-APU": "../ZIC-APU"
-}
-
-# Configurations tested for each solution.
-configurations = ['baseline', 'cpu8', 'fork8', 'memcpy8', 'open8', 'udp8']
+# The two solutions, their base directories and the configurations tested
+# for each of them are shared with the other scripts.
+from sample_store import configurations, list_benchmarks, load_series, ns_to_ms, solutions
+from density import draw_violin, kde_grid_points, series_curve, solution_curves
+from downsample import cdf_grid_points, cdf_points, downsample_series, line_marker, max_line_points
 
 # Base directory to save the benchmark comparison plots.
 compare_plots_base = os.path.abspath("../compare_plots")
 
 # Create separate directories for each plot type.
-plot_types = {
-    'standard': os.path.join(compare_plots_base, 'standard_plots'),
-    'box': os.path.join(compare_plots_base, 'box_plots'),
-    'violin': os.path.join(compare_plots_base, 'violin_plots'),
-    'cdf': os.path.join(compare_plots_base, 'cdf_plots'),
-}
-for folder in plot_types.values():
-    os.makedirs(folder, exist_ok=True)
+plot_type_names = ['standard', 'box', 'violin', 'cdf']
+plot_types = {name: os.path.join(compare_plots_base, f"{name}_plots") for name in plot_type_names}
 
-def read_execution_times(file_path):
+def selection_plots_dir(plots_dir, configs):
     """
-    Reads the execution times from a file.
-    Expected formats:
-      - "1854131 ns"  -> interpreted as nanoseconds and converted to milliseconds.
-      - "1.853"       -> interpreted as seconds and converted to milliseconds.
-    Lines starting with "Statistics -" are skipped.
+    Directory of the figures restricted to some configurations, inside the
+    one of the full figures, so a subset run never replaces them.
     """
-    execution_times = []
-    try:
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("Statistics -"):
-                continue
-            # Check if line ends with "ns" (nanoseconds)
-            ns_match = re.match(r'^([0-9]*\.?[0-9]+)\s*ns$', line)
-            if ns_match:
-                try:
-                    ns_val = float(ns_match.group(1))
-                    ms_val = ns_val / 1e6  # convert ns to ms
-                    execution_times.append(ms_val)
-                    continue
-                except Exception as conv_err:
-                    print(f"Error converting line '{line}' in {file_path}: {conv_err}")
-            # Otherwise, assume the value is in seconds.
-            try:
-                sec_val = float(line)
-                ms_val = sec_val * 1000  # convert seconds to ms
-                execution_times.append(ms_val)
-            except Exception as conv_err:
-                print(f"Error processing line '{line}' in {file_path}: {conv_err}")
-        return execution_times
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return []
+    return os.path.join(plots_dir, 'configs_' + '+'.join(configs))
 
-def find_benchmark_files(solution_dir, configuration):
+def set_solutions(sols, configs=None, plots_dir=None):
     """
-    Returns a dictionary mapping benchmark names to file paths for a given
-    solution's configuration directory. It looks for files ending with either
-    '_results.txt' or '_execution_time.txt'.
+    Compares other solution directories ({name: path}) and saves the figures
+    under plots_dir. Also used as the initializer of the render workers.
     """
-    benchmark_files = {}
-    config_dir = os.path.join(solution_dir, configuration)
-    if not os.path.isdir(config_dir):
-        return benchmark_files
-    for f in os.listdir(config_dir):
-        if f.endswith('_results.txt'):
-            benchmark = f[:-len('_results.txt')]
-            benchmark_files[benchmark] = os.path.join(config_dir, f)
-        elif f.endswith('_execution_time.txt'):
-            benchmark = f[:-len('_execution_time.txt')]
-            if benchmark not in benchmark_files:
-                benchmark_files[benchmark] = os.path.join(config_dir, f)
-    return benchmark_files
+    global solutions, configurations, compare_plots_base, plot_types
+    solutions = dict(sols)
+    configurations = list(configs or configurations)
+    compare_plots_base = os.path.abspath(plots_dir or compare_plots_base)
+    plot_types = {name: os.path.join(compare_plots_base, f"{name}_plots") for name in plot_type_names}
+    get_benchmark_data.cache_clear()
 
 # ------------------------------------------------------------------
-# First, build a data structure organized as:
-# data[solution][configuration][benchmark] = execution_times (list)
+# Samples are loaded on demand, one benchmark at a time, and memoized:
+# bench_data[benchmark][configuration][solution] = execution_times (ms array)
 # ------------------------------------------------------------------
-data = {}
-for sol_name, sol_dir in solutions.items():
-    data[sol_name] = {}
-    for config in configurations:
-        bench_files = find_benchmark_files(sol_dir, config)
-        data[sol_name][config] = {}
-        for bench, file_path in bench_files.items():
-            exec_times = read_execution_times(file_path)
-            if exec_times:
-                data[sol_name][config][bench] = exec_times
-            else:
-                print(f"No valid data in {file_path}")
+@functools.lru_cache(maxsize=None)
+def get_benchmark_data(benchmark):
+    """Returns {configuration: {solution: ms array}} for one benchmark, reading only its arrays."""
+    benchmark_data = {}
+    for sol_name, sol_dir in solutions.items():
+        for config in configurations:
+            exec_times = load_series(sol_dir, config, benchmark)
+            if exec_times is not None and exec_times.size:
+                benchmark_data.setdefault(config, {})[sol_name] = ns_to_ms(exec_times)
+    return benchmark_data
 
-# ------------------------------------------------------------------
-# Rearrange data to be organized by benchmark.
-# bench_data[benchmark][configuration][solution] = execution_times
-# ------------------------------------------------------------------
-bench_data = {}
-for sol_name in solutions.keys():
-    for config in configurations:
-        for bench, exec_times in data[sol_name][config].items():
-            bench_data.setdefault(bench, {}).setdefault(config, {})[sol_name] = exec_times
+def list_all_benchmarks():
+    """Benchmarks available for at least one solution, from the store indexes only."""
+    benchmarks = set()
+    for sol_dir in solutions.values():
+        benchmarks |= list_benchmarks(sol_dir, configurations)
+    return sorted(benchmarks)
 
 # ------------------------------------------------------------------
 # Now define plotting functions for each plot type for a given benchmark.
@@ -117,12 +64,13 @@ for sol_name in solutions.keys():
 # In each subplot the two solutions (if available) are plotted.
 # ------------------------------------------------------------------
 
-def plot_standard_benchmark(benchmark, bench_data):
-    nrows = len(configurations)
+def plot_standard_benchmark(benchmark, bench_data, configs=None):
+    configs = configs or configurations
+    nrows = len(configs)
     fig, axes = plt.subplots(nrows, 1, figsize=(10, nrows * 3), sharex=False)
     if nrows == 1:
         axes = [axes]
-    for idx, config in enumerate(configurations):
+    for idx, config in enumerate(configs):
         ax = axes[idx]
         config_data = bench_data.get(benchmark, {}).get(config, {})
         if not config_data:
@@ -132,8 +80,10 @@ def plot_standard_benchmark(benchmark, bench_data):
             continue
         for sol_name in solutions.keys():
             exec_times = config_data.get(sol_name)
-            if exec_times:
-                ax.plot(range(len(exec_times)), exec_times, marker='o', linestyle='-', label=sol_name)
+            if exec_times is not None and len(exec_times):
+                sample_index, values = downsample_series(exec_times)
+                ax.plot(sample_index, values, marker=line_marker(len(exec_times), 'o'), linestyle='-',
+                        label=sol_name)
             else:
                 ax.text(0.5, 0.5, f"{sol_name} missing", horizontalalignment='center',
                         verticalalignment='center', transform=ax.transAxes)
@@ -149,12 +99,13 @@ def plot_standard_benchmark(benchmark, bench_data):
     plt.close()
     print(f"Standard plot for benchmark '{benchmark}' saved to {save_path}")
 
-def plot_box_benchmark(benchmark, bench_data):
-    nrows = len(configurations)
+def plot_box_benchmark(benchmark, bench_data, configs=None):
+    configs = configs or configurations
+    nrows = len(configs)
     fig, axes = plt.subplots(nrows, 1, figsize=(10, nrows * 3), sharey=True)
     if nrows == 1:
         axes = [axes]
-    for idx, config in enumerate(configurations):
+    for idx, config in enumerate(configs):
         ax = axes[idx]
         config_data = bench_data.get(benchmark, {}).get(config, {})
         if not config_data:
@@ -167,11 +118,13 @@ def plot_box_benchmark(benchmark, bench_data):
         labels = []
         for sol_name in solutions.keys():
             exec_times = config_data.get(sol_name)
-            if exec_times:
+            if exec_times is not None and len(exec_times):
                 box_data.append(exec_times)
                 labels.append(sol_name)
         if box_data:
-            ax.boxplot(box_data, labels=labels)
+            ax.boxplot(box_data)
+            ax.set_xticks(range(1, len(labels) + 1))
+            ax.set_xticklabels(labels, rotation=45, fontsize=9)
         ax.set_title(f"Configuration: {config}")
         ax.set_xlabel("Solution")
         ax.set_ylabel("Execution Time (ms)")
@@ -183,12 +136,13 @@ def plot_box_benchmark(benchmark, bench_data):
     plt.close()
     print(f"Box plot for benchmark '{benchmark}' saved to {save_path}")
 
-def plot_violin_benchmark(benchmark, bench_data):
-    nrows = len(configurations)
+def plot_violin_benchmark(benchmark, bench_data, configs=None):
+    configs = configs or configurations
+    nrows = len(configs)
     fig, axes = plt.subplots(nrows, 1, figsize=(10, nrows * 3), sharey=True)
     if nrows == 1:
         axes = [axes]
-    for idx, config in enumerate(configurations):
+    for idx, config in enumerate(configs):
         ax = axes[idx]
         config_data = bench_data.get(benchmark, {}).get(config, {})
         if not config_data:
@@ -203,13 +157,15 @@ def plot_violin_benchmark(benchmark, bench_data):
         pos = 1
         for sol_name in solutions.keys():
             exec_times = config_data.get(sol_name)
-            if exec_times:
+            if exec_times is not None and len(exec_times):
                 violin_data.append(exec_times)
                 positions.append(pos)
                 labels.append(sol_name)
                 pos += 1
         if violin_data:
-            parts = ax.violinplot(violin_data, positions=positions, showmeans=False, showmedians=True)
+            for exec_times, pos, sol_name in zip(violin_data, positions, labels):
+                curve = series_curve(solutions[sol_name], config, benchmark, exec_times)
+                draw_violin(ax, pos, curve, exec_times, width=0.5)
             ax.set_xticks(positions)
             ax.set_xticklabels(labels, rotation=45, fontsize=9)
         ax.set_title(f"Configuration: {config}")
@@ -223,12 +179,13 @@ def plot_violin_benchmark(benchmark, bench_data):
     plt.close()
     print(f"Violin plot for benchmark '{benchmark}' saved to {save_path}")
 
-def plot_cdf_benchmark(benchmark, bench_data):
-    nrows = len(configurations)
+def plot_cdf_benchmark(benchmark, bench_data, configs=None):
+    configs = configs or configurations
+    nrows = len(configs)
     fig, axes = plt.subplots(nrows, 1, figsize=(10, nrows * 3), sharex=False)
     if nrows == 1:
         axes = [axes]
-    for idx, config in enumerate(configurations):
+    for idx, config in enumerate(configs):
         ax = axes[idx]
         config_data = bench_data.get(benchmark, {}).get(config, {})
         if not config_data:
@@ -238,10 +195,10 @@ def plot_cdf_benchmark(benchmark, bench_data):
             continue
         for sol_name in solutions.keys():
             exec_times = config_data.get(sol_name)
-            if exec_times:
-                sorted_times = np.sort(exec_times)
-                cdf = np.arange(1, len(sorted_times) + 1) / len(sorted_times)
-                ax.plot(sorted_times, cdf, marker='.', linestyle='-', label=sol_name)
+            if exec_times is not None and len(exec_times):
+                sorted_times, cdf = cdf_points(exec_times)
+                ax.plot(sorted_times, cdf, marker=line_marker(len(exec_times), '.', cdf_grid_points),
+                        linestyle='-', label=sol_name)
             else:
                 ax.text(0.5, 0.5, f"{sol_name} missing", horizontalalignment='center',
                         verticalalignment='center', transform=ax.transAxes)
@@ -258,15 +215,63 @@ def plot_cdf_benchmark(benchmark, bench_data):
     print(f"CDF plot for benchmark '{benchmark}' saved to {save_path}")
 
 # ------------------------------------------------------------------
-# Main loop: For every benchmark in bench_data, create one figure per plot type.
+# Main loop: For every selected benchmark, create one figure per plot type.
 # ------------------------------------------------------------------
+plot_functions = {
+    'standard': plot_standard_benchmark,
+    'box': plot_box_benchmark,
+    'violin': plot_violin_benchmark,
+    'cdf': plot_cdf_benchmark,
+}
+
+# Parameters every figure depends on besides its samples; part of the plot manifest hash.
+plot_params = {'solutions': list(solutions), 'configurations': configurations, 'row_height': 3,
+               'max_line_points': max_line_points, 'cdf_grid_points': cdf_grid_points,
+               'kde_grid_points': kde_grid_points}
+
+def render_comparison(benches=None, configs=None, jobs=1, force=False):
+    """
+    Renders every stale comparison figure of the selected benchmarks and
+    configurations. Figures of a subset of the configurations are written
+    under selection_plots_dir.
+    """
+    if configs and list(configs) != configurations:
+        set_solutions(solutions, configs, selection_plots_dir(compare_plots_base, configs))
+    configs = configurations
+    for folder in plot_types.values():
+        os.makedirs(folder, exist_ok=True)
+    if not benches:
+        # All curves are needed: (re)build them once here, before any worker needs them.
+        # A selection of benchmarks only computes the curves of its own series.
+        for sol_dir in solutions.values():
+            solution_curves(sol_dir)
+
+    items = []
+    for benchmark in benches or list_all_benchmarks():
+        benchmark_data = get_benchmark_data(benchmark)
+        if not benchmark_data:
+            print(f"No data for benchmark '{benchmark}'")
+            continue
+        # Each worker only receives (and the manifest only hashes) the arrays of its own benchmark.
+        items.append((benchmark, ({benchmark: benchmark_data}, configs)))
+
+    params = dict(plot_params, solutions=list(solutions), configurations=configurations)
+    report_failures(render_stale_figures(compare_plots_base, plot_types, plot_functions, params,
+                                         items, jobs, force, set_solutions,
+                                         (solutions, configurations, compare_plots_base)))
+
 def main():
-    for benchmark in sorted(bench_data.keys()):
-        print(f"Creating plots for benchmark: {benchmark}")
-        plot_standard_benchmark(benchmark, bench_data)
-        plot_box_benchmark(benchmark, bench_data)
-        plot_violin_benchmark(benchmark, bench_data)
-        plot_cdf_benchmark(benchmark, bench_data)
+    parser = argparse.ArgumentParser(description="Render Preempt-RT vs ZIC-APU comparison plots.")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of worker processes (0 = one per CPU core)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render every figure even if its inputs did not change")
+    parser.add_argument('--bench', nargs='+', help="only these benchmarks (default: all)")
+    parser.add_argument('--config', nargs='+', choices=configurations,
+                        help="only these configurations as rows (default: all); "
+                             "written under compare_plots/configs_<names>")
+    args = parser.parse_args()
+    render_comparison(args.bench, args.config, args.jobs or default_jobs(), args.force)
 
 if __name__ == "__main__":
     main()
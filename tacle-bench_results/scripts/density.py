@@ -0,0 +1,153 @@
+"""
+Kernel density curves for the violin plots.
+
+Samples are linearly binned on a regular grid and convolved with a Gaussian
+kernel through an FFT, so the cost is O(n + g log g) instead of the O(n * g)
+of a direct KDE evaluated at g grid points. The bandwidth follows Scott's
+rule and the grid extends `cut` bandwidths past the extremes.
+
+Curves of every (configuration, benchmark) of a solution are cached in a
+compressed .npz next to its sample store and rebuilt when the store's
+sources change; both graph.py and compare_graphs.py draw their violins
+from these curves.
+"""
+import os
+import numpy as np
+
+from sample_store import get_store, ns_to_ms, sources_key
+
+# Number of grid points of one density curve.
+kde_grid_points = 256
+
+# The grid extends this many bandwidths past the smallest and largest sample.
+kde_cut = 3
+
+# Cache of the density curves written inside each solution directory.
+density_filename = 'density_cache.npz'
+
+# Key holding the grid size the cached curves were computed with.
+grid_key = '__grid_points__'
+
+def scott_bandwidth(values):
+    std = np.std(values)
+    if std == 0:
+        # Constant series: a narrow bump around the single value.
+        std = max(abs(float(values[0])) * 1e-3, 1e-9)
+    return std * len(values) ** (-1 / 5)
+
+def binned_kde(values, grid_points=kde_grid_points, cut=kde_cut, weights=None, bandwidth=None):
+    """
+    Returns (grid, density) of the Gaussian KDE of a 1D array, as a (2, grid_points)
+    array. weights (e.g. the bucket counts of a sketch) count every value that
+    many times; bandwidth overrides Scott's rule.
+    """
+    values = np.asarray(values, dtype=float)
+    if weights is None:
+        weights = np.ones(len(values))
+    h = bandwidth or scott_bandwidth(values)
+    low = values.min() - cut * h
+    high = values.max() + cut * h
+    grid, delta = np.linspace(low, high, grid_points, retstep=True)
+
+    # Linear binning: each sample splits its weight between its two neighbouring grid points.
+    position = (values - low) / delta
+    left = np.minimum(np.floor(position).astype(np.int64), grid_points - 2)
+    weight = position - left
+    counts = (np.bincount(left, weights * (1 - weight), minlength=grid_points)
+              + np.bincount(left + 1, weights * weight, minlength=grid_points))
+
+    # Gaussian kernel sampled on the grid step, truncated at 4 bandwidths.
+    half = min(grid_points - 1, int(np.ceil(4 * h / delta)))
+    kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * delta / h) ** 2)
+    size = 1 << int(np.ceil(np.log2(grid_points + 2 * half + 1)))
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(smoothed[half:half + grid_points], 0)
+    density /= density.sum() * delta
+    return np.stack([grid, density])
+
+def density_path(solution_dir):
+    return os.path.join(solution_dir, density_filename)
+
+def build_density_cache(solution_dir, store, grid_points=kde_grid_points):
+    """Computes the curve of every series in a solution store and writes the cache."""
+    curves = {key: binned_kde(ns_to_ms(store[key]), grid_points)
+              for key in store.files if key != sources_key}
+    path = density_path(solution_dir)
+    np.savez_compressed(path, **curves, **{sources_key: store[sources_key],
+                                           grid_key: np.array(grid_points)})
+    print(f"Density cache written to {path} ({len(curves)} curves)")
+    return curves
+
+# Curves loaded by solution_curves, one dict per solution directory.
+loaded_curves = {}
+
+def cached_curves(solution_dir, grid_points=kde_grid_points):
+    """
+    The curves of the density cache of a solution if it matches the current
+    sample store, otherwise None; nothing is rebuilt. Memoized per process.
+    """
+    if solution_dir in loaded_curves:
+        return loaded_curves[solution_dir]
+    path = density_path(solution_dir)
+    if not os.path.exists(path):
+        return None
+    sources = str(get_store(solution_dir)[sources_key])
+    try:
+        with np.load(path) as cache:
+            if str(cache[sources_key]) != sources or int(cache[grid_key]) != grid_points:
+                return None
+            curves = {key: cache[key] for key in cache.files if key not in (sources_key, grid_key)}
+    except (KeyError, ValueError):
+        print(f"Ignoring unreadable density cache {path}")
+        return None
+    loaded_curves[solution_dir] = curves
+    return curves
+
+def solution_curves(solution_dir, grid_points=kde_grid_points):
+    """
+    Returns {"<configuration>/<benchmark>": (2, grid_points) array} for one
+    solution, from the cache when it matches the current sample store.
+    Memoized per process.
+    """
+    curves = cached_curves(solution_dir, grid_points)
+    if curves is None:
+        curves = build_density_cache(solution_dir, get_store(solution_dir), grid_points)
+        loaded_curves[solution_dir] = curves
+    return curves
+
+def series_curve(solution_dir, config, benchmark, exec_times=None):
+    """
+    The cached curve of one series; computed directly from exec_times (ms)
+    when the cache is stale or has no such series, so drawing a few
+    figures never rebuilds the curves of a whole solution. A sketch passed
+    as exec_times (see sketch.py) gives its own curve.
+    """
+    if hasattr(exec_times, 'density_curve'):
+        return exec_times.density_curve()
+    curve = (cached_curves(solution_dir) or {}).get(f"{config}/{benchmark}")
+    if curve is None and exec_times is not None and len(exec_times):
+        curve = binned_kde(exec_times)
+    return curve
+
+def series_extent(exec_times):
+    """(minimum, median, maximum) of an ms array, or of a sketch."""
+    if hasattr(exec_times, 'quantile'):
+        return exec_times.quantile(0), exec_times.quantile(0.5), exec_times.quantile(1)
+    return np.min(exec_times), np.median(exec_times), np.max(exec_times)
+
+def draw_violin(ax, position, curve, exec_times, width=0.8, color='C0'):
+    """
+    Draws one vertical violin from a density curve, with the median as a
+    horizontal bar and a line spanning the observed minimum to maximum.
+    """
+    grid, density = curve
+    low, median, high = series_extent(exec_times)
+    # Only the span of the samples is drawn, like the violins of matplotlib.
+    inside = (grid >= low) & (grid <= high)
+    if np.count_nonzero(inside) < 2:
+        inside = np.ones(len(grid), dtype=bool)
+    half_width = density[inside] / density.max() * width / 2
+    ax.fill_betweenx(grid[inside], position - half_width, position + half_width,
+                     facecolor=color, edgecolor=color, alpha=0.4)
+    ax.vlines(position, low, high, color=color, linewidth=1)
+    ax.hlines(median, position - width / 4, position + width / 4, color=color, linewidth=1.5)
@@ -0,0 +1,90 @@
+"""
+Shape-preserving downsampling of long series before they are drawn.
+
+Line plots keep, per bucket of consecutive samples, either the minimum and
+the maximum (min-max) or the point forming the largest triangle with its
+neighbours (LTTB). CDFs are evaluated on a grid of order statistics that is
+linear in probability plus geometrically refined towards the upper tail.
+Every method always keeps the global minimum and maximum (the observed
+WCET). Series shorter than the point budget are returned unchanged.
+"""
+import numpy as np
+
+# Point budgets of one drawn line.
+max_line_points = 2000
+cdf_grid_points = 1000
+
+def minmax_indices(values, max_points):
+    """Indices of the minimum and maximum of every bucket, in sample order."""
+    n = len(values)
+    n_buckets = max(max_points // 2, 1)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    # Equal-width buckets as a padded matrix, so argmin/argmax run on all of them at once.
+    width = int(np.diff(edges).max())
+    idx = edges[:-1, None] + np.arange(width)[None, :]
+    inside = idx < edges[1:, None]
+    idx = np.minimum(idx, n - 1)
+    bucket_values = values[idx]
+    low = np.take_along_axis(idx, np.argmin(np.where(inside, bucket_values, np.inf), axis=1)[:, None], axis=1)
+    high = np.take_along_axis(idx, np.argmax(np.where(inside, bucket_values, -np.inf), axis=1)[:, None], axis=1)
+    return np.unique(np.concatenate([low[:, 0], high[:, 0]]))
+
+def lttb_indices(values, max_points):
+    """Largest-Triangle-Three-Buckets selection; first and last samples are kept."""
+    n = len(values)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    x = np.arange(n, dtype=float)
+    selected = np.empty(max_points - 1, dtype=np.int64)
+    selected[0] = 0
+    previous = 0
+    for b in range(max_points - 2):
+        start, stop = edges[b], edges[b + 1]
+        # Average of the next bucket (the last sample for the last bucket).
+        next_stop = edges[b + 2] if b + 2 < len(edges) else n
+        next_start = stop if b + 2 < len(edges) else n - 1
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = values[next_start:next_stop].mean()
+        area = np.abs((x[previous] - avg_x) * (values[start:stop] - values[previous])
+                      - (x[previous] - x[start:stop]) * (avg_y - values[previous]))
+        previous = start + int(np.argmax(area))
+        selected[b + 1] = previous
+    return np.concatenate([selected, [n - 1]])
+
+def downsample_series(values, max_points=max_line_points, method='minmax'):
+    """
+    Returns (sample indices, values) of at most about max_points samples of a
+    series in sample order; the global extremes are always included.
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n), values
+    if method == 'lttb':
+        keep = lttb_indices(values, max_points)
+    else:
+        keep = minmax_indices(values, max_points)
+    keep = np.union1d(keep, [np.argmin(values), np.argmax(values)])
+    return keep, values[keep]
+
+def cdf_points(values, grid_points=cdf_grid_points):
+    """
+    Returns (sorted values, cumulative probabilities) of the empirical CDF,
+    evaluated at about grid_points order statistics when the series is
+    longer. Half of the grid is spent on the upper tail, where the
+    exceedance probability falls geometrically, so the approach to the
+    maximum keeps its resolution.
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n <= grid_points:
+        sorted_values = np.sort(values)
+        return sorted_values, np.arange(1, n + 1) / n
+    linear = np.linspace(0, n - 1, grid_points // 2)
+    tail = n - np.geomspace(1, n, grid_points - grid_points // 2)
+    ranks = np.unique(np.clip(np.round(np.concatenate([linear, tail])), 0, n - 1).astype(np.int64))
+    # Only the selected order statistics are placed, no full sort.
+    return np.partition(values, ranks)[ranks], (ranks + 1) / n
+
+def line_marker(n, marker, max_points=max_line_points):
+    """The marker for series drawn in full, none for downsampled ones."""
+    return marker if n <= max_points else None
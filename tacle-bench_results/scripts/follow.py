@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Follows one or more growing UART logs and keeps running per-benchmark
+statistics in memory, refreshing a summary table every few seconds.
+
+Each refresh only parses the bytes appended since the previous one, so the
+cost of an update is proportional to the new lines, not to the whole log.
+
+Example:
+    python follow.py ../ZIC-APU/udp8_uart_log6.txt --interval 10 --summary live_summary.txt
+"""
+import os
+import sys
+import time
+import math
+import argparse
+
+from ingest import benchmark_pattern, iter_lines
+
+# Quantiles tracked with the P-square streaming estimator.
+tracked_quantiles = (0.5, 0.9, 0.99)
+
+class P2Quantile:
+    """
+    P-square estimator (Jain & Chlamtac, 1985) of a single quantile.
+    It keeps five markers, so memory and update cost are constant.
+    """
+    def __init__(self, q):
+        self.q = q
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in range(1, 4):
+            d = self.desired[i] - self.positions[i]
+            if (d >= 1 and self.positions[i + 1] - self.positions[i] > 1) or \
+               (d <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                d = 1 if d > 0 else -1
+                h = self._parabolic(i, d)
+                if not heights[i - 1] < h < heights[i + 1]:
+                    h = self._linear(i, d)
+                heights[i] = h
+                self.positions[i] += d
+
+    def _parabolic(self, i, d):
+        n, h = self.positions, self.heights
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1]))
+
+    def _linear(self, i, d):
+        n, h = self.positions, self.heights
+        return h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+
+    def value(self):
+        heights = self.heights
+        if not heights:
+            return math.nan
+        if len(heights) < 5:
+            # Too few samples for the markers: use the exact order statistic.
+            return heights[min(len(heights) - 1, int(round(self.q * (len(heights) - 1))))]
+        return heights[2]
+
+class RunningStats:
+    """Count, mean, Welford variance, min, max and streaming quantiles of one benchmark."""
+    def __init__(self, quantiles=tracked_quantiles):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.quantiles = [P2Quantile(q) for q in quantiles]
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        for estimator in self.quantiles:
+            estimator.add(x)
+
+    def std_dev(self):
+        return math.sqrt(self.m2 / self.count) if self.count else math.nan
+
+def log_size(path):
+    """Current size of a log, or None while it does not exist (the capture has not started)."""
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return None
+
+class LogFollower:
+    """
+    Remembers how far each log has been read and feeds new samples to the
+    aggregates. Logs that do not exist yet are followed from their start
+    once they appear.
+    """
+    def __init__(self, log_paths, from_end=False):
+        self.offsets = {path: ((log_size(path) or 0) if from_end else 0) for path in log_paths}
+        self.stats = {}
+
+    def poll(self):
+        """Reads the complete lines appended since the last poll; returns the number of new samples."""
+        new_samples = 0
+        for path, offset in self.offsets.items():
+            size = log_size(path)
+            if size is None:
+                continue
+            if size < offset:
+                # The capture was restarted: follow the new file from its start.
+                offset = 0
+            try:
+                log_file = open(path, 'rb')
+            except FileNotFoundError:
+                # Removed since its size was read, e.g. rotated by the capture.
+                continue
+            with log_file:
+                for line_offset, line in iter_lines(log_file, offset):
+                    offset = line_offset + len(line)
+                    match = benchmark_pattern.search(line)
+                    if match:
+                        bench = match.group(1).decode()
+                        self.stats.setdefault(bench, RunningStats()).add(int(match.group(2)))
+                        new_samples += 1
+            self.offsets[path] = offset
+        return new_samples
+
+def format_table(stats):
+    """Returns a compact summary table (times in ms)."""
+    header = (f"{'benchmark':<16}{'n':>6}{'mean':>12}{'std':>10}{'min':>12}"
+              + ''.join(f"{'p' + format(q * 100, 'g'):>12}" for q in tracked_quantiles)
+              + f"{'max':>12}")
+    rows = [header, '-' * len(header)]
+    for bench in sorted(stats):
+        s = stats[bench]
+        rows.append(f"{bench:<16}{s.count:>6}{s.mean / 1e6:>12.4f}{s.std_dev() / 1e6:>10.4f}{s.min / 1e6:>12.4f}"
+                    + ''.join(f"{e.value() / 1e6:>12.4f}" for e in s.quantiles)
+                    + f"{s.max / 1e6:>12.4f}")
+    return '\n'.join(rows) + '\n'
+
+def write_summary(path, table):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(table)
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow UART logs and show live benchmark statistics.")
+    parser.add_argument('logs', nargs='+', help="UART log files to follow")
+    parser.add_argument('--interval', type=float, default=5.0, help="seconds between refreshes")
+    parser.add_argument('--summary', help="file rewritten with the summary table at every refresh")
+    parser.add_argument('--from-end', action='store_true', help="ignore what the logs already contain")
+    parser.add_argument('--once', action='store_true', help="read the logs, print the table and exit")
+    args = parser.parse_args()
+
+    follower = LogFollower(args.logs, from_end=args.from_end)
+    try:
+        while True:
+            new_samples = follower.poll()
+            table = format_table(follower.stats)
+            if args.summary:
+                write_summary(args.summary, table)
+            if sys.stdout.isatty() and not args.once:
+                sys.stdout.write('\x1b[2J\x1b[H')
+            sys.stdout.write(f"{time.strftime('%H:%M:%S')}  +{new_samples} samples\n{table}")
+            sys.stdout.flush()
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
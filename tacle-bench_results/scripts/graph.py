@@ -1,94 +1,77 @@
 import os
-import re
+import argparse
+from render_pool import default_jobs, render_stale_figures, report_failures
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
+from changepoint import detect_changes
+from density import draw_violin, kde_grid_points, series_curve, solution_curves
+from downsample import cdf_grid_points, cdf_points, downsample_series, line_marker, max_line_points
+from pwcet import exceedance_curve
+from sample_store import configurations, discover_configurations, load_solution, ns_to_ms
+from sketch import QuantileSketch, draw_sketch_boxes
+
 # Directory containing the extracted files
 base_dir = '../Preempt-RT-containers'
-configurations = ['baseline', 'cpu8', 'fork8', 'memcpy8', 'open8', 'udp8']
 
 # Base directory to save the plots
 plots_base_dir = os.path.join(base_dir, 'plots')
 
-# Create subdirectories for each plot type
-plot_types = {
-    'standard': os.path.join(plots_base_dir, 'standard_plots'),
-    'box': os.path.join(plots_base_dir, 'box_plots'),
-    'violin': os.path.join(plots_base_dir, 'violin_plots'),
-    'cdf': os.path.join(plots_base_dir, 'cdf_plots'),
-}
+# Plot type names; each gets a <type>_plots subdirectory of plots_base_dir.
+plot_type_names = ['standard', 'box', 'violin', 'cdf', 'exceedance']
+plot_types = {name: os.path.join(plots_base_dir, f"{name}_plots") for name in plot_type_names}
 
-for folder in plot_types.values():
-    os.makedirs(folder, exist_ok=True)
+# Plot types that can be drawn from quantile sketches alone (see sketch.py).
+sketch_plot_types = ['box', 'violin', 'cdf']
 
-def read_execution_times(file_path):
+# Exceedance probabilities at which the fitted pWCET curve is drawn.
+pwcet_probabilities = np.logspace(-1, -12, 45)
+
+def set_solution(solution_dir):
     """
-    Reads the execution times from a file.
-    Expected formats:
-      - "1854131 ns"  -> interpreted as nanoseconds and converted to milliseconds.
-      - "1.853"       -> interpreted as seconds and converted to milliseconds.
-    Lines starting with "Statistics -" are skipped.
+    Points the plot functions at another solution directory. Also used as the
+    initializer of the render workers, so they save to the same place.
     """
-    execution_times = []
-    try:
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("Statistics -"):
-                continue
-            # Check for a line ending with "ns" (nanoseconds)
-            ns_match = re.match(r'^([0-9]*\.?[0-9]+)\s*ns$', line)
-            if ns_match:
-                try:
-                    ns_val = float(ns_match.group(1))
-                    # Convert nanoseconds to milliseconds
-                    ms_val = ns_val / 1e6
-                    execution_times.append(ms_val)
-                    continue
-                except Exception as conv_err:
-                    print(f"Error converting line '{line}' in {file_path}: {conv_err}")
-            # Fallback: assume the line is a plain number in seconds.
-            try:
-                sec_val = float(line)
-                # Convert seconds to milliseconds
-                ms_val = sec_val * 1000
-                execution_times.append(ms_val)
-            except Exception as conv_err:
-                print(f"Error processing line '{line}' in {file_path}: {conv_err}")
-        return execution_times
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return []
-
-def gather_benchmark_data(benchmark):
+    global base_dir, plots_base_dir, plot_types
+    base_dir = solution_dir
+    plots_base_dir = os.path.join(base_dir, 'plots')
+    plot_types = {name: os.path.join(plots_base_dir, f"{name}_plots") for name in plot_type_names}
+
+def gather_benchmark_data(benchmark, solution_data):
     """
-    For a given benchmark name, checks for files in each configuration.
-    It first looks for <benchmark>_results.txt, and if not found, for <benchmark>_execution_time.txt.
+    For a given benchmark name, collects its samples (converted to milliseconds)
+    from every configuration of the already loaded solution data. Sketches
+    are passed on as they are.
     """
     data = []
     labels = []
-    for config in configurations:
-        file_path = os.path.join(base_dir, config, f"{benchmark}_results.txt")
-        if not os.path.exists(file_path):
-            file_path = os.path.join(base_dir, config, f"{benchmark}_execution_time.txt")
-        if os.path.exists(file_path):
-            execution_times = read_execution_times(file_path)
-            if execution_times:  # Only add if data is non-empty
-                data.append(execution_times)
-                labels.append(config)
-            else:
-                print(f"No valid data in file: {file_path}")
+    for config in solution_data:
+        exec_times = solution_data.get(config, {}).get(benchmark)
+        if exec_times is not None and len(exec_times):
+            data.append(exec_times if isinstance(exec_times, QuantileSketch) else ns_to_ms(exec_times))
+            labels.append(config)
         else:
-            print(f"File not found for configuration '{config}' and benchmark '{benchmark}'")
+            print(f"No data for configuration '{config}' and benchmark '{benchmark}'")
     return data, labels
 
-def plot_standard(benchmark, data, labels):
-    """Creates a standard (line) plot of execution times for each configuration."""
+def plot_standard(benchmark, data, labels, annotations=None):
+    """
+    Creates a standard (line) plot of execution times for each configuration.
+    With annotations (see changepoint.py), the warm-up prefix of every series
+    is shaded and its level shift is marked with a dashed vertical line.
+    """
     plt.figure(figsize=(10, 6))
-    for exec_times, label in zip(data, labels):
-        plt.plot(range(len(exec_times)), exec_times, marker='o', linestyle='-', label=label)
+    for idx, (exec_times, label) in enumerate(zip(data, labels)):
+        color = f"C{idx}"
+        sample_index, values = downsample_series(exec_times)
+        plt.plot(sample_index, values, marker=line_marker(len(exec_times), 'o'), linestyle='-',
+                 color=color, label=label)
+        if annotations:
+            if annotations[idx]['warmup']:
+                plt.axvspan(-0.5, annotations[idx]['warmup'] - 0.5, color=color, alpha=0.1)
+            if annotations[idx]['level_shift'] is not None:
+                plt.axvline(annotations[idx]['level_shift'] - 0.5, color=color, linestyle='--')
     plt.title(f"Standard Plot of Execution Times for {benchmark}")
     plt.xlabel("Sample Index")
     plt.ylabel("Execution Time (ms)")
@@ -100,10 +83,13 @@ def plot_standard(benchmark, data, labels):
     plt.close()
     print(f"Standard plot saved to {save_path}")
 
-def plot_box(benchmark, data, labels):
+def plot_box(benchmark, data, labels, annotations=None):
     """Creates a box plot of execution times for each configuration."""
     plt.figure(figsize=(10, 6))
-    sns.boxplot(data=data)
+    if isinstance(data[0], QuantileSketch):
+        draw_sketch_boxes(plt.gca(), data)
+    else:
+        sns.boxplot(data=data)
     plt.xticks(ticks=range(len(labels)), labels=labels)
     plt.title(f"Box Plot of Execution Times for {benchmark}")
     plt.xlabel("Configuration")
@@ -115,10 +101,12 @@ def plot_box(benchmark, data, labels):
     plt.close()
     print(f"Box plot saved to {save_path}")
 
-def plot_violin(benchmark, data, labels):
-    """Creates a violin plot of execution times for each configuration."""
+def plot_violin(benchmark, data, labels, annotations=None):
+    """Creates a violin plot of execution times for each configuration, from the cached density curves."""
     plt.figure(figsize=(10, 6))
-    sns.violinplot(data=data)
+    ax = plt.gca()
+    for idx, (exec_times, label) in enumerate(zip(data, labels)):
+        draw_violin(ax, idx, series_curve(base_dir, label, benchmark, exec_times), exec_times, color=f"C{idx}")
     plt.xticks(ticks=range(len(labels)), labels=labels)
     plt.title(f"Violin Plot of Execution Times for {benchmark}")
     plt.xlabel("Configuration")
@@ -130,13 +118,16 @@ def plot_violin(benchmark, data, labels):
     plt.close()
     print(f"Violin plot saved to {save_path}")
 
-def plot_cdf(benchmark, data, labels):
+def plot_cdf(benchmark, data, labels, annotations=None):
     """Creates a cumulative distribution function (CDF) plot for each configuration."""
     plt.figure(figsize=(10, 6))
     for exec_times, label in zip(data, labels):
-        sorted_times = np.sort(exec_times)
-        cdf = np.arange(1, len(sorted_times) + 1) / len(sorted_times)
-        plt.plot(sorted_times, cdf, marker='.', linestyle='-', label=label)
+        if isinstance(exec_times, QuantileSketch):
+            sorted_times, cdf = exec_times.cdf_points()
+        else:
+            sorted_times, cdf = cdf_points(exec_times)
+        plt.plot(sorted_times, cdf, marker=line_marker(len(exec_times), '.', cdf_grid_points),
+                 linestyle='-', label=label)
     plt.title(f"CDF Plot of Execution Times for {benchmark}")
     plt.xlabel("Execution Time (ms)")
     plt.ylabel("Cumulative Probability")
@@ -148,31 +139,101 @@ def plot_cdf(benchmark, data, labels):
     plt.close()
     print(f"CDF plot saved to {save_path}")
 
-def main():
-    # Discover benchmarks from the baseline directory.
-    baseline_dir = os.path.join(base_dir, 'baseline')
-    benchmarks_set = set()
-    for f in os.listdir(baseline_dir):
-        if f.endswith('_results.txt'):
-            benchmarks_set.add(f[:-len("_results.txt")])
-        elif f.endswith('_execution_time.txt'):
-            benchmarks_set.add(f[:-len("_execution_time.txt")])
-    benchmarks = sorted(list(benchmarks_set))
-    
+def plot_exceedance(benchmark, data, labels, annotations=None):
+    """
+    Draws, for each configuration, the empirical exceedance probability of
+    the samples and the pWCET curve of a GEV fit to their block maxima.
+    """
+    plt.figure(figsize=(10, 6))
+    for idx, (exec_times, label) in enumerate(zip(data, labels)):
+        color = f"C{idx}"
+        sorted_times, p_emp, x_fit = exceedance_curve(exec_times, pwcet_probabilities)
+        plt.step(sorted_times, p_emp, where='post', color=color, label=f"{label} (observed)")
+        if not np.all(np.isnan(x_fit)):
+            plt.plot(x_fit, pwcet_probabilities, linestyle='--', color=color, label=f"{label} (pWCET)")
+    plt.yscale('log')
+    plt.ylim(pwcet_probabilities[-1], 1.1)
+    plt.title(f"Exceedance Plot of Execution Times for {benchmark}")
+    plt.xlabel("Execution Time (ms)")
+    plt.ylabel("Exceedance Probability")
+    plt.legend(fontsize='small')
+    plt.grid(True, which='both')
+    plt.tight_layout()
+    save_path = os.path.join(plot_types['exceedance'], f"{benchmark}_exceedance.png")
+    plt.savefig(save_path)
+    plt.close()
+    print(f"Exceedance plot saved to {save_path}")
+
+plot_functions = {
+    'standard': plot_standard,
+    'box': plot_box,
+    'violin': plot_violin,
+    'cdf': plot_cdf,
+    'exceedance': plot_exceedance,
+}
+
+# Parameters every figure depends on besides its samples; part of the plot manifest hash.
+plot_params = {'configurations': configurations, 'figsize': (10, 6),
+               'max_line_points': max_line_points, 'cdf_grid_points': cdf_grid_points,
+               'kde_grid_points': kde_grid_points}
+
+def render_solution(solution_dir, configs=None, jobs=1, force=False, annotate=False, from_sketches=False):
+    """
+    Renders every stale figure of one solution into <solution_dir>/plots.
+    With from_sketches only the sketch_plot_types are drawn, from the
+    quantile sketches of the solution, and no sample is loaded.
+    """
+    set_solution(solution_dir)
+    for folder in plot_types.values():
+        os.makedirs(folder, exist_ok=True)
+
+    if from_sketches:
+        from sketch import sketch_configurations, solution_sketches
+        configs = configs or sketch_configurations(base_dir)
+        solution_data = solution_sketches(base_dir, configs)
+        functions = {name: plot_functions[name] for name in sketch_plot_types}
+        annotate = False
+    else:
+        # Load all configurations in one bulk read; benchmarks come from the baseline.
+        configs = configs or discover_configurations(base_dir)
+        solution_data = load_solution(base_dir, configs)
+        # Density curves are (re)built once here, before any worker needs them.
+        solution_curves(base_dir)
+        functions = plot_functions
+    reference = solution_data.get('baseline') or (solution_data[configs[0]] if configs else {})
+    benchmarks = sorted(reference.keys())
+
     if not benchmarks:
         print("No benchmark files found in the baseline directory.")
         return
 
+    items = []
     for benchmark in benchmarks:
         print(f"Processing benchmark: {benchmark}")
-        data, labels = gather_benchmark_data(benchmark)
+        data, labels = gather_benchmark_data(benchmark, solution_data)
         if not data:
             print(f"No data available for benchmark: {benchmark}")
             continue
-        plot_standard(benchmark, data, labels)
-        plot_box(benchmark, data, labels)
-        plot_violin(benchmark, data, labels)
-        plot_cdf(benchmark, data, labels)
+        annotations = detect_changes(data) if annotate else None
+        items.append((benchmark, (data, labels, annotations)))
+
+    params = dict(plot_params, configurations=configs)
+    report_failures(render_stale_figures(plots_base_dir, plot_types, functions, params,
+                                         items, jobs, force, set_solution, (solution_dir,)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Render per-benchmark plots for one solution.")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of worker processes (0 = one per CPU core)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render every figure even if its inputs did not change")
+    parser.add_argument('--annotate', action='store_true',
+                        help="mark detected warm-up and level shifts on the standard plots")
+    parser.add_argument('--from-sketches', action='store_true',
+                        help="draw the box, violin and CDF plots from the quantile sketches only")
+    args = parser.parse_args()
+    render_solution(base_dir, jobs=args.jobs or default_jobs(), force=args.force, annotate=args.annotate,
+                    from_sketches=args.from_sketches)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Streams any number of UART logs once and appends the benchmark execution
+times they contain to <out_dir>/<configuration>/<benchmark>_results.txt.
+
+Every appended sample gets a provenance line in <benchmark>_provenance.txt:
+the log it came from, the boot of the board within that log (the kernel
+timestamps restart at every reboot), its line number and the last kernel
+timestamp printed before it. shards.py reads these to tell the sessions of
+a configuration apart. The quantile sketch of every results file
+(<benchmark>_sketch.npz, see sketch.py) is updated with the new samples.
+
+A manifest in <out_dir> records, for every log, the byte offset up to which
+it has already been ingested, so re-running only reads what was appended to
+a log since the previous run and never duplicates samples.
+
+Example:
+    python ingest.py ../ZIC-APU/udp8_uart_log*.txt
+"""
+import os
+import re
+import json
+import argparse
+from collections import defaultdict
+import numpy as np
+
+# Regular expression to match the benchmark lines.
+# It looks for a line like:
+# "Benchmark adpcm_dec execution time:  70656 ns"
+benchmark_pattern = re.compile(rb'Benchmark\s+(\S+)\s+execution time(?:\s+is)?:\s+(\d+)\s+ns')
+
+# Kernel messages start with the time since boot: "[  342.477518] psci: ...".
+kernel_timestamp_pattern = re.compile(rb'\[\s*(\d+\.\d+)\]')
+
+# Suffix of the per-benchmark provenance files written next to the results.
+provenance_suffix = '_provenance.txt'
+
+# Name of the offset manifest written in the output directory.
+manifest_filename = 'ingest_manifest.json'
+
+# Logs are read in blocks of this size; only complete lines are parsed.
+block_size = 1 << 20
+
+def config_from_log(log_path):
+    """
+    Derives the configuration from a log name: "udp8_uart_log3.txt" -> "udp8".
+    Logs without a prefix ("uart_log.txt") belong to the baseline.
+    """
+    name = os.path.basename(log_path)
+    prefix = name.split('uart_log')[0].rstrip('_')
+    return prefix or 'baseline'
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, manifest_filename)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, manifest_filename)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def manifest_key(log_path, out_dir):
+    return os.path.relpath(os.path.abspath(log_path), os.path.abspath(out_dir))
+
+def iter_lines(log_file, offset):
+    """
+    Yields (line_offset, line) for every complete line after offset.
+    A trailing line without newline is left for the next run.
+    """
+    log_file.seek(offset)
+    carry = b''
+    position = offset
+    while True:
+        block = log_file.read(block_size)
+        if not block:
+            break
+        block = carry + block
+        end = block.rfind(b'\n') + 1
+        carry = block[end:]
+        start = 0
+        while start < end:
+            stop = block.index(b'\n', start) + 1
+            yield position, block[start:stop]
+            position += stop - start
+            start = stop
+
+def new_position():
+    """Reading position at the start of a log: line count, last kernel timestamp, boot."""
+    return {'line': 0, 'timestamp': None, 'boot': 0}
+
+def advance_position(position, line):
+    """Counts one line and follows the kernel timestamp it starts with, if any."""
+    position['line'] += 1
+    if line.startswith(b'['):
+        stamp = kernel_timestamp_pattern.match(line)
+        if stamp:
+            timestamp = float(stamp.group(1))
+            if position['timestamp'] is not None and timestamp < position['timestamp']:
+                # The kernel clock went backwards: the board was rebooted.
+                position['boot'] += 1
+            position['timestamp'] = timestamp
+
+def position_at(log_path, offset):
+    """Position of a log at offset (a line boundary), from its first offset bytes."""
+    position = new_position()
+    with open(log_path, 'rb') as log_file:
+        head = log_file.read(offset)
+    for line in head.split(b'\n')[:-1]:
+        advance_position(position, line)
+    return position
+
+def scan_log(log_path, offset, results, provenance=None, log_name=None, position=None):
+    """
+    Parses a log from offset, buffering matches in results[benchmark].
+    With provenance, the (log_name, boot, line, timestamp) of every match is
+    buffered in provenance[benchmark] as well; position describes the log at
+    offset (see new_position) and is advanced in place.
+    Returns the offset just past the last complete line read.
+    """
+    if position is None:
+        position = new_position()
+    end_offset = offset
+    with open(log_path, 'rb') as log_file:
+        for line_offset, line in iter_lines(log_file, offset):
+            advance_position(position, line)
+            match = benchmark_pattern.search(line)
+            if match:
+                benchmark_name = match.group(1).decode()
+                results[benchmark_name].append(match.group(2).decode())
+                if provenance is not None:
+                    provenance[benchmark_name].append(
+                        (log_name, position['boot'], position['line'], position['timestamp']))
+            end_offset = line_offset + len(line)
+    return end_offset
+
+def format_provenance(records):
+    """One "<log> <boot> <line> <timestamp>" line per sample; 'nan' before the first timestamp."""
+    return ''.join(f"{log} {boot} {line} {'nan' if ts is None else f'{ts:.6f}'}\n"
+                   for log, boot, line, ts in records)
+
+def write_provenance(config_dir, provenance):
+    for benchmark_name, records in sorted(provenance.items()):
+        with open(os.path.join(config_dir, f"{benchmark_name}{provenance_suffix}"), 'a') as outfile:
+            outfile.write(format_provenance(records))
+
+def write_results(config_dir, results, provenance=None):
+    """
+    Appends the buffered samples (and their provenance) with a single write
+    per file, and folds them into the quantile sketch of the file (sketch.py).
+    """
+    from sketch import append_to_sketch
+    os.makedirs(config_dir, exist_ok=True)
+    for benchmark_name, execution_times in sorted(results.items()):
+        results_filename = os.path.join(config_dir, f"{benchmark_name}_results.txt")
+        previous_stat = os.stat(results_filename) if os.path.exists(results_filename) else None
+        with open(results_filename, 'a') as outfile:
+            outfile.write(''.join(f"{t} ns\n" for t in execution_times))
+        append_to_sketch(results_filename, previous_stat, np.array(execution_times, dtype=np.int64))
+        print(f"{len(execution_times)} samples appended to {results_filename}")
+    if provenance is not None:
+        write_provenance(config_dir, provenance)
+
+def adopt_provenance(config_dir, results, provenance):
+    """
+    Writes the provenance of series extracted by hand, when their results
+    file holds exactly the samples read from the logs, in the same order.
+    Returns the benchmarks that could not be matched.
+    """
+    from sample_store import find_benchmark_files, read_execution_times
+    unmatched = []
+    files = find_benchmark_files(os.path.dirname(config_dir), os.path.basename(config_dir))
+    for benchmark_name, execution_times in sorted(results.items()):
+        provenance_filename = os.path.join(config_dir, f"{benchmark_name}{provenance_suffix}")
+        if benchmark_name not in files or os.path.exists(provenance_filename):
+            continue
+        stored = read_execution_times(files[benchmark_name])
+        if np.array_equal(stored, np.array(execution_times, dtype=np.int64)):
+            with open(provenance_filename, 'w') as outfile:
+                outfile.write(format_provenance(provenance[benchmark_name]))
+        else:
+            unmatched.append(benchmark_name)
+    return unmatched
+
+def ingest_logs(log_paths, out_dir, config=None, mark_only=False):
+    """
+    Ingests every log once. Logs of the same configuration are buffered
+    together, so each results file is opened at most once per run.
+    With mark_only the manifest is advanced without writing any sample,
+    which adopts logs that were already extracted by hand; the provenance
+    of the series that match the logs exactly is written all the same.
+    """
+    manifest = load_manifest(out_dir)
+    pending = defaultdict(lambda: defaultdict(list))
+    pending_provenance = defaultdict(lambda: defaultdict(list))
+    for log_path in log_paths:
+        key = manifest_key(log_path, out_dir)
+        entry = manifest.get(key, {})
+        offset = entry.get('offset', 0)
+        position = entry.get('position', new_position())
+        size = os.path.getsize(log_path)
+        if size < offset:
+            print(f"{log_path} shrank below its recorded offset, reading it from the start")
+            offset = 0
+        if offset == 0:
+            position = new_position()
+        elif 'position' not in entry:
+            # Manifest written before provenance was recorded.
+            position = position_at(log_path, offset)
+        log_config = config or config_from_log(log_path)
+        new_offset = scan_log(log_path, offset, pending[log_config], pending_provenance[log_config],
+                              key, position)
+        manifest[key] = {'config': log_config, 'offset': new_offset, 'position': position}
+        print(f"{log_path}: read bytes {offset}-{new_offset} into '{log_config}'")
+
+    for log_config, results in pending.items():
+        config_dir = os.path.join(out_dir, log_config)
+        if not mark_only:
+            write_results(config_dir, results, pending_provenance[log_config])
+        else:
+            unmatched = adopt_provenance(config_dir, results, pending_provenance[log_config])
+            if unmatched:
+                print(f"'{log_config}': no provenance for {len(unmatched)} series that differ "
+                      f"from the logs ({', '.join(unmatched)})")
+    # The manifest is only advanced once the samples are on disk.
+    save_manifest(out_dir, manifest)
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract benchmark execution times from UART logs.")
+    parser.add_argument('logs', nargs='+', help="UART log files to ingest")
+    parser.add_argument('--out-dir', help="solution directory holding the configuration folders "
+                                          "(default: the directory of the first log)")
+    parser.add_argument('--config', help="configuration for all logs (default: derived from each log name)")
+    parser.add_argument('--mark-only', action='store_true',
+                        help="record the current end of each log without writing samples")
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or os.path.dirname(os.path.abspath(args.logs[0]))
+    ingest_logs(args.logs, out_dir, config=args.config, mark_only=args.mark_only)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Rebuilds the Jailhouse cell lifecycle of every benchmark iteration from the
+kernel timestamps in the UART logs, to measure partitioning overhead and not
+only the in-cell execution time.
+
+One iteration looks like:
+    [t0] psci: CPU0 killed                 CPU0 leaves Linux
+    [t1] Created Jailhouse cell "..."      cell created
+         Benchmark X execution time: N ns  (no kernel timestamp)
+    [t2] CPU0: Booted secondary processor  CPU0 back online in Linux
+    [t3] Destroyed Jailhouse cell "..."    cell destroyed
+    [t4] ...: drop_caches: 3               caches flushed
+    [t5] psci: CPU0 killed                 next iteration
+
+Derived latencies (ms):
+    offline_to_create  t1 - t0
+    cell_active        t2 - t1  (cell owns CPU0: load, start, run, shutdown)
+    cell_overhead      cell_active - execution time (create-to-start + shutdown)
+    reonline_to_destroy t3 - t2 (teardown after CPU re-online)
+    destroy_to_flush   t4 - t3
+    turnaround         t5 - t0  (whole iteration)
+
+Example:
+    python lifecycle.py ../ZIC-APU/*uart_log*.txt
+"""
+import re
+import argparse
+import csv
+import numpy as np
+
+from ingest import benchmark_pattern, config_from_log, iter_lines
+
+# Kernel timestamp at the start of a dmesg line: "[ 2109.986320] ..."
+timestamp_pattern = re.compile(rb'\[\s*(\d+\.\d+)\]')
+
+# Lifecycle events, in the order they appear in one iteration.
+event_patterns = {
+    'killed': re.compile(rb'psci: CPU0 killed'),
+    'created': re.compile(rb'Created Jailhouse cell'),
+    'booted': re.compile(rb'CPU0: Booted secondary processor'),
+    'destroyed': re.compile(rb'Destroyed Jailhouse cell'),
+    'flushed': re.compile(rb'drop_caches'),
+}
+
+# Latencies derived from two events: name -> (start event, end event).
+latencies = {
+    'offline_to_create': ('killed', 'created'),
+    'cell_active': ('created', 'booted'),
+    'reonline_to_destroy': ('booted', 'destroyed'),
+    'destroy_to_flush': ('destroyed', 'flushed'),
+}
+
+# Default outputs, next to the solution directories.
+default_records = '../lifecycle_records.csv'
+default_summary = '../lifecycle_summary.csv'
+
+def new_record(log_path, config):
+    return {'log': log_path, 'config': config, 'benchmark': None, 'execution_ns': None}
+
+def parse_lifecycle(log_path, config=None):
+    """
+    Returns one record per iteration (CPU0 offlining) of a log, with the
+    kernel timestamp (s) of each lifecycle event, the benchmark and its
+    execution time. Iterations that crashed have no benchmark.
+    """
+    config = config or config_from_log(log_path)
+    records = []
+    current = None
+    with open(log_path, 'rb') as log_file:
+        for _, line in iter_lines(log_file, 0):
+            match = benchmark_pattern.search(line)
+            if match and current is not None:
+                current['benchmark'] = match.group(1).decode()
+                current['execution_ns'] = int(match.group(2))
+                continue
+            stamp = timestamp_pattern.search(line)
+            if not stamp:
+                continue
+            t = float(stamp.group(1))
+            for event, pattern in event_patterns.items():
+                if pattern.search(line):
+                    if event == 'killed':
+                        if current is not None:
+                            current['next_killed'] = t
+                            records.append(current)
+                        current = new_record(log_path, config)
+                    if current is not None and event not in current:
+                        current[event] = t
+                    break
+    if current is not None:
+        records.append(current)
+    return records
+
+def derive_latencies(record):
+    """Adds the derived latencies (ms) to a record; missing events give NaN."""
+    for name, (start, end) in latencies.items():
+        record[name] = (record[end] - record[start]) * 1e3 if start in record and end in record else np.nan
+    record['turnaround'] = ((record['next_killed'] - record['killed']) * 1e3
+                            if 'next_killed' in record and 'killed' in record else np.nan)
+    execution_ms = record['execution_ns'] / 1e6 if record['execution_ns'] is not None else np.nan
+    record['cell_overhead'] = record['cell_active'] - execution_ms
+    return record
+
+def summarize(records):
+    """Median and max of every latency per (configuration, benchmark)."""
+    metrics = list(latencies) + ['cell_overhead', 'turnaround']
+    groups = {}
+    for record in records:
+        if record['benchmark'] is not None:
+            groups.setdefault((record['config'], record['benchmark']), []).append(record)
+    summary = []
+    for (config, bench), group in sorted(groups.items()):
+        values = np.array([[r[m] for m in metrics] for r in group], dtype=float)
+        row = {'configuration': config, 'benchmark': bench, 'iterations': len(group)}
+        with np.errstate(all='ignore'):
+            medians = np.nanmedian(values, axis=0)
+            maxima = np.nanmax(values, axis=0)
+        for m, median, maximum in zip(metrics, medians, maxima):
+            row[f"{m}_median"] = median
+            row[f"{m}_max"] = maximum
+        summary.append(row)
+    return summary
+
+def write_csv(rows, path, fieldnames):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: (f"{v:.6f}" if isinstance(v, float) else v) for k, v in row.items()})
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Jailhouse cell lifecycle overheads from UART logs.")
+    parser.add_argument('logs', nargs='+', help="UART log files")
+    parser.add_argument('--config', help="configuration for all logs (default: derived from each log name)")
+    parser.add_argument('--records', default=default_records, help="per-iteration CSV to write")
+    parser.add_argument('--summary', default=default_summary, help="per-benchmark summary CSV to write")
+    args = parser.parse_args()
+
+    records = []
+    for log_path in args.logs:
+        log_records = [derive_latencies(r) for r in parse_lifecycle(log_path, args.config)]
+        crashed = sum(r['benchmark'] is None for r in log_records)
+        print(f"{log_path}: {len(log_records)} iterations ({crashed} without a benchmark result)")
+        records.extend(log_records)
+    if not records:
+        print("No lifecycle events found.")
+        return
+
+    fields = (['log', 'config', 'benchmark', 'execution_ns'] + list(event_patterns) + ['next_killed']
+              + list(latencies) + ['cell_overhead', 'turnaround'])
+    write_csv(records, args.records, fields)
+    summary = summarize(records)
+    write_csv(summary, args.summary, list(summary[0].keys()) if summary else ['configuration', 'benchmark'])
+    print(f"Lifecycle records written to {args.records}, summary to {args.summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Suite-wide small-multiples overviews: one figure per plot type and
+configuration, with one row per benchmark and the solutions overlaid in
+each row.
+
+Every value is divided by the baseline median of the same benchmark (of
+each solution itself, or of one reference solution with --reference), so
+all benchmarks share one x axis. The figures are drawn from cached
+summaries only: a 101-point quantile grid per series (quantile_cache.npz
+next to the sample store) and the density curves of density.py. Each figure
+is a handful of matplotlib collections, not one artist per benchmark.
+
+    box     p25-p75 box, p1-p99 whiskers, median bar and max marker
+    violin  split violins, one half per solution
+    cdf     the CDF of every series, scaled into its row
+
+Example:
+    python overview.py --reference ZIC-APU
+"""
+import os
+import argparse
+import numpy as np
+
+from density import kde_grid_points, solution_curves
+from sample_store import configurations, get_store, ns_to_ms, solutions, sources_key
+
+# Figures are written into <type>_plots subdirectories of this directory.
+default_plots_dir = '../overview_plots'
+
+# Quantile grid of the cached summaries, in percent.
+quantile_grid = np.linspace(0, 100, 101)
+
+# Cache of the quantile summaries written inside each solution directory.
+quantile_filename = 'quantile_cache.npz'
+
+# Vertical offset of each solution's box inside a benchmark row.
+box_offsets = [-0.18, 0.18]
+
+plot_type_names = ['box', 'violin', 'cdf']
+plot_types = {name: os.path.join(os.path.abspath(default_plots_dir), f"{name}_plots")
+              for name in plot_type_names}
+
+def set_plots_dir(plots_dir):
+    """Saves the figures under plots_dir; also the initializer of the render workers."""
+    global plot_types
+    plot_types = {name: os.path.join(os.path.abspath(plots_dir), f"{name}_plots") for name in plot_type_names}
+
+def solution_quantiles(solution_dir):
+    """
+    Returns {"<configuration>/<benchmark>": quantiles (ms) on quantile_grid},
+    from the cache when it matches the current sample store.
+    """
+    store = get_store(solution_dir)
+    path = os.path.join(solution_dir, quantile_filename)
+    if os.path.exists(path):
+        try:
+            with np.load(path) as cache:
+                if str(cache[sources_key]) == str(store[sources_key]):
+                    return {key: cache[key] for key in cache.files if key != sources_key}
+        except (KeyError, ValueError):
+            print(f"Ignoring unreadable quantile cache {path}")
+    summaries = {key: np.percentile(ns_to_ms(store[key]), quantile_grid)
+                 for key in store.files if key != sources_key}
+    np.savez_compressed(path, **summaries, **{sources_key: store[sources_key]})
+    print(f"Quantile cache written to {path} ({len(summaries)} series)")
+    return summaries
+
+def build_overview_data(sols, configs, reference=None):
+    """
+    Returns {configuration: summary} where each summary holds, for every
+    (solution, benchmark), the normalized quantiles and density curve as
+    arrays of shape (solutions, benchmarks, points); missing series are NaN.
+    Configurations without any normalized series are left out.
+    """
+    quantiles = {name: solution_quantiles(path) for name, path in sols.items()}
+    curves = {name: solution_curves(path) for name, path in sols.items()}
+    benchmarks = sorted({key.split('/', 1)[1] for q in quantiles.values() for key in q})
+    median_index = int(np.searchsorted(quantile_grid, 50))
+
+    def baseline_median(sol_name, bench):
+        q = quantiles[reference or sol_name].get(f"baseline/{bench}")
+        return q[median_index] if q is not None else np.nan
+
+    scale = np.array([[baseline_median(s, b) for b in benchmarks] for s in sols])
+    grid_points = kde_grid_points
+    overview = {}
+    for config in configs:
+        q = np.full((len(sols), len(benchmarks), len(quantile_grid)), np.nan)
+        kde_x = np.full((len(sols), len(benchmarks), grid_points), np.nan)
+        kde_d = np.full((len(sols), len(benchmarks), grid_points), np.nan)
+        for i, sol_name in enumerate(sols):
+            for j, bench in enumerate(benchmarks):
+                key = f"{config}/{bench}"
+                if key in quantiles[sol_name]:
+                    q[i, j] = quantiles[sol_name][key]
+                if key in curves[sol_name]:
+                    kde_x[i, j], density = curves[sol_name][key]
+                    kde_d[i, j] = density / density.max()
+        if np.isnan(q / scale[:, :, None]).all():
+            # No solution has data (or a baseline median) here: nothing to draw, and no axis limits.
+            print(f"No data to overview for configuration '{config}'")
+            continue
+        overview[config] = {
+            'solutions': list(sols),
+            'benchmarks': benchmarks,
+            'quantiles': q / scale[:, :, None],
+            'kde_x': kde_x / scale[:, :, None],
+            'kde_d': kde_d,
+        }
+    return overview
+
+def quantile_column(summary, percent):
+    return summary['quantiles'][:, :, int(np.searchsorted(quantile_grid, percent))]
+
+def new_overview_axes(summary, title):
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import FormatStrFormatter, LogLocator, NullFormatter
+    n = len(summary['benchmarks'])
+    fig, ax = plt.subplots(figsize=(10, 0.22 * n + 1.5))
+    ax.set_yticks(range(n))
+    ax.set_yticklabels(summary['benchmarks'], fontsize=7)
+    ax.set_ylim(n - 0.5, -0.5)
+    ax.set_xscale('log')
+    # Collections do not drive the log-axis autoscaling reliably: limits come from the extremes.
+    ax.set_xlim(np.nanmin(summary['quantiles'][:, :, 0]) / 1.05,
+                np.nanmax(summary['quantiles'][:, :, -1]) * 1.05)
+    ax.xaxis.set_major_locator(LogLocator(subs=(1, 2, 5)))
+    ax.xaxis.set_major_formatter(FormatStrFormatter('%g'))
+    ax.xaxis.set_minor_formatter(NullFormatter())
+    ax.axvline(1.0, color='k', linewidth=0.8)
+    ax.set_xlabel("Execution time / baseline median")
+    ax.set_title(title)
+    ax.grid(True, axis='x', which='both', alpha=0.3)
+    return fig, ax
+
+def save_overview(fig, ax, summary, plot_type, config):
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    ax.legend(handles=[Patch(color=f"C{i}", label=s) for i, s in enumerate(summary['solutions'])],
+              fontsize='small', loc='lower right')
+    fig.tight_layout()
+    save_path = os.path.join(plot_types[plot_type], f"{config}_{plot_type}.png")
+    fig.savefig(save_path)
+    plt.close(fig)
+    print(f"Overview {plot_type} plot saved to {save_path}")
+
+def plot_box_overview(config, summary):
+    """Box glyphs from the cached quantiles, one row per benchmark."""
+    from matplotlib.collections import LineCollection, PolyCollection
+    fig, ax = new_overview_axes(summary, f"Box overview: {config}")
+    rows = np.arange(len(summary['benchmarks']))
+    for i, _ in enumerate(summary['solutions']):
+        color = f"C{i}"
+        y = rows + box_offsets[i % len(box_offsets)]
+        p1, p25, p50, p75, p99, p100 = (quantile_column(summary, p)[i] for p in (1, 25, 50, 75, 99, 100))
+        ok = ~np.isnan(p50)
+        h = 0.14
+        boxes = [[(a, c - h), (b, c - h), (b, c + h), (a, c + h)] for a, b, c in zip(p25[ok], p75[ok], y[ok])]
+        ax.add_collection(PolyCollection(boxes, facecolors=color, edgecolors=color, alpha=0.5))
+        whiskers = [[(a, c), (b, c)] for a, b, c in zip(p1[ok], p99[ok], y[ok])]
+        medians = [[(m, c - h), (m, c + h)] for m, c in zip(p50[ok], y[ok])]
+        ax.add_collection(LineCollection(whiskers + medians, colors=color, linewidths=1))
+        ax.scatter(p100[ok], y[ok], marker='|', color=color, s=20)
+    save_overview(fig, ax, summary, 'box', config)
+
+def plot_violin_overview(config, summary):
+    """Split violins from the cached density curves; first solution above, second below."""
+    from matplotlib.collections import PolyCollection
+    fig, ax = new_overview_axes(summary, f"Violin overview: {config}")
+    for i, _ in enumerate(summary['solutions']):
+        sign = -1 if i % 2 == 0 else 1
+        polygons = []
+        for row in range(len(summary['benchmarks'])):
+            x = summary['kde_x'][i, row]
+            if np.isnan(x).all():
+                continue
+            # Only the span of the samples is drawn, as in the per-benchmark violins.
+            low, high = summary['quantiles'][i, row, [0, -1]]
+            inside = (x >= low) & (x <= high)
+            if np.count_nonzero(inside) < 2:
+                continue
+            x = x[inside]
+            y = row + sign * 0.45 * summary['kde_d'][i, row][inside]
+            polygons.append(np.column_stack([np.r_[x, x[::-1]], np.r_[y, np.full(len(x), row)]]))
+        ax.add_collection(PolyCollection(polygons, facecolors=f"C{i}", edgecolors=f"C{i}", alpha=0.5))
+    save_overview(fig, ax, summary, 'violin', config)
+
+def plot_cdf_overview(config, summary):
+    """CDFs from the cached quantile grid, each scaled into its benchmark row."""
+    from matplotlib.collections import LineCollection
+    fig, ax = new_overview_axes(summary, f"CDF overview: {config}")
+    p = quantile_grid / 100
+    for i, _ in enumerate(summary['solutions']):
+        lines = [np.column_stack([summary['quantiles'][i, row], row + 0.45 - 0.9 * p])
+                 for row in range(len(summary['benchmarks']))
+                 if not np.isnan(summary['quantiles'][i, row]).all()]
+        ax.add_collection(LineCollection(lines, colors=f"C{i}", linewidths=1))
+    save_overview(fig, ax, summary, 'cdf', config)
+
+plot_functions = {
+    'box': plot_box_overview,
+    'violin': plot_violin_overview,
+    'cdf': plot_cdf_overview,
+}
+
+def render_overviews(sols=None, configs=None, plots_dir=default_plots_dir, reference=None,
+                     jobs=1, force=False):
+    """Renders every stale overview figure, one per plot type and configuration."""
+    from render_pool import render_stale_figures, report_failures
+    sols = sols or solutions
+    configs = configs or configurations
+    set_plots_dir(plots_dir)
+    for folder in plot_types.values():
+        os.makedirs(folder, exist_ok=True)
+    overview = build_overview_data(sols, configs, reference)
+    items = [(config, (summary,)) for config, summary in overview.items()]
+    params = {'reference': reference, 'quantile_grid': quantile_grid}
+    report_failures(render_stale_figures(os.path.abspath(plots_dir), plot_types, plot_functions, params,
+                                         items, jobs, force, set_plots_dir, (plots_dir,)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Render suite-wide overview figures.")
+    parser.add_argument('--reference', choices=list(solutions),
+                        help="normalize every solution to this solution's baseline median "
+                             "(default: each solution to its own)")
+    parser.add_argument('--plots-dir', default=default_plots_dir, help="directory for the figures")
+    parser.add_argument('--jobs', type=int, default=1, help="number of worker processes")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render every figure even if its inputs did not change")
+    args = parser.parse_args()
+    render_overviews(plots_dir=args.plots_dir, reference=args.reference, jobs=args.jobs, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import json
+import inspect
+import hashlib
+import functools
+import numpy as np
+
+# Name of the build manifest written in each plots directory.
+manifest_filename = 'plot_manifest.json'
+
+def update_hash(h, obj):
+    """Feeds nested dicts/lists/arrays/scalars into a hash in a stable order."""
+    if isinstance(obj, dict):
+        h.update(b'{')
+        for key in sorted(obj):
+            update_hash(h, key)
+            update_hash(h, obj[key])
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for item in obj:
+            update_hash(h, item)
+        h.update(b']')
+    elif hasattr(obj, 'to_arrays'):
+        # Quantile sketches (sketch.py) are hashed through their arrays.
+        update_hash(h, obj.to_arrays())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"array{obj.dtype.str}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    else:
+        h.update(repr(obj).encode())
+
+@functools.lru_cache(maxsize=None)
+def module_source(module):
+    return inspect.getsource(module)
+
+def referenced_names(code):
+    """Global names used by a code object and by the functions nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= referenced_names(const)
+    return names
+
+def helper_sources(plot_function):
+    """
+    Source code of the helpers a plot function calls: the source of each
+    function of its own module it references, and the whole source of each
+    other module of these scripts it takes a function or class from.
+    """
+    own_module = inspect.getmodule(plot_function)
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = {}
+    for name in sorted(referenced_names(plot_function.__code__)):
+        obj = plot_function.__globals__.get(name)
+        if not (inspect.isfunction(obj) or inspect.isclass(obj)):
+            continue
+        module = inspect.getmodule(obj)
+        module_file = getattr(module, '__file__', None)
+        if module_file is None or os.path.dirname(os.path.abspath(module_file)) != scripts_dir:
+            continue
+        if module is own_module:
+            sources[name] = inspect.getsource(obj)
+        else:
+            sources[module.__name__] = module_source(module)
+    return sources
+
+def figure_hash(plot_type, plot_function, params, inputs):
+    """
+    Hash of everything a figure depends on: its plot type, the source code of
+    the function drawing it and of the helpers it calls, the plotting
+    parameters and the input arrays.
+    """
+    h = hashlib.sha1()
+    update_hash(h, plot_type)
+    update_hash(h, inspect.getsource(plot_function))
+    update_hash(h, helper_sources(plot_function))
+    update_hash(h, params)
+    update_hash(h, inputs)
+    return h.hexdigest()
+
+class PlotManifest:
+    """Records the input hash of every figure written under a plots directory."""
+    def __init__(self, plots_dir):
+        self.plots_dir = plots_dir
+        self.path = os.path.join(plots_dir, manifest_filename)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                print(f"Ignoring unreadable plot manifest {self.path}")
+
+    def key(self, save_path):
+        return os.path.relpath(os.path.abspath(save_path), os.path.abspath(self.plots_dir))
+
+    def is_current(self, save_path, digest):
+        """True if the figure exists and was rendered from the same inputs."""
+        return self.entries.get(self.key(save_path)) == digest and os.path.exists(save_path)
+
+    def record(self, save_path, digest):
+        self.entries[self.key(save_path)] = digest
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def plan_figures(manifest, benchmark, plot_functions, save_paths, params, inputs, force=False):
+    """
+    Returns the plot functions of a benchmark whose figure is missing or out
+    of date, with the hash each of them must be recorded under once rendered.
+    """
+    stale = []
+    for plot_type, plot_function in plot_functions.items():
+        digest = figure_hash(plot_type, plot_function, params, inputs)
+        if force or not manifest.is_current(save_paths[plot_type], digest):
+            stale.append((plot_type, plot_function, digest))
+    return stale
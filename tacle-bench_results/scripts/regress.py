@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Regression gate: compares the execution times in fresh UART logs against the
+reference distributions of a solution directory and exits non-zero when a
+benchmark regressed.
+
+The logs are only read (nothing is appended to the solution directory). For
+every benchmark found in them, the relative increase of the median, p99 and
+max over the reference is checked against its tolerance, and a two-sample
+Kolmogorov-Smirnov test flags distribution shifts. All benchmarks are
+compared in one batched pass.
+
+The reference is the sample store of the solution by default; with
+--from-stats the stats cache is used instead, which only holds median and
+max, so p99 and the KS test are skipped.
+
+Status per benchmark:
+    FAIL  a metric exceeds its tolerance
+    SHIFT only the KS test is significant, and the median did not drop
+          (fails with --strict)
+    NOREF the reference has no samples of the benchmark
+          (fails unless --allow-noref)
+    ok
+
+The exit code is 2 when no benchmark could be compared at all, e.g. when the
+configuration derived from the log names matches nothing in the reference.
+
+Example:
+    python regress.py new_uart_log.txt --reference ../ZIC-APU --config baseline
+"""
+import sys
+import argparse
+from collections import defaultdict
+import numpy as np
+
+from ingest import config_from_log, scan_log
+from pwcet import ks_2samp_rows
+from sample_store import load_series, ns_to_ms
+from stats_cache import cached_statistics
+from tail_stats import pad_series
+
+# Default tolerated relative increase of each metric.
+default_tolerances = {'median': 0.05, 'p99': 0.10, 'max': 0.20}
+
+def read_fresh_logs(log_paths, config=None):
+    """Returns samples[config][benchmark] (ns) of all the logs, without ingesting them."""
+    pending = defaultdict(lambda: defaultdict(list))
+    for log_path in log_paths:
+        scan_log(log_path, 0, pending[config or config_from_log(log_path)])
+    return {c: {b: np.array(t, dtype=np.int64) for b, t in results.items()} for c, results in pending.items()}
+
+def series_metrics(series):
+    """Median, p99 and max of every ms array, in one pass over the padded matrix."""
+    matrix = pad_series(series)
+    median, p99 = np.nanpercentile(matrix, [50, 99], axis=1)
+    return matrix, {'median': median, 'p99': p99, 'max': np.nanmax(matrix, axis=1)}
+
+def reference_from_store(reference_dir, keys):
+    """ms arrays of the reference samples for (config, benchmark) keys; None when missing."""
+    return [load_series(reference_dir, config, bench) for config, bench in keys]
+
+def reference_from_stats(reference_dir, keys):
+    """Reference metrics from the stats cache; p99 is not cached and stays NaN."""
+    stats = cached_statistics(reference_dir, sorted({config for config, _ in keys}))
+    metrics = {name: np.full(len(keys), np.nan) for name in default_tolerances}
+    found = np.zeros(len(keys), dtype=bool)
+    for i, (config, bench) in enumerate(keys):
+        entry = stats.get(config, {}).get(bench)
+        if entry:
+            metrics['median'][i] = entry['median']
+            metrics['max'][i] = entry['max']
+            found[i] = True
+    return found, metrics
+
+def check_regressions(fresh, reference_dir, tolerances=default_tolerances, alpha=0.01, from_stats=False):
+    """Returns one row dict per (configuration, benchmark) of the fresh samples."""
+    keys = [(config, bench) for config in sorted(fresh) for bench in sorted(fresh[config])
+            if len(fresh[config][bench])]
+    if not keys:
+        return []
+    new_matrix, new = series_metrics([ns_to_ms(fresh[c][b]) for c, b in keys])
+    p_ks = np.full(len(keys), np.nan)
+    if from_stats:
+        found, ref = reference_from_stats(reference_dir, keys)
+    else:
+        reference = reference_from_store(reference_dir, keys)
+        found = np.array([r is not None and len(r) > 0 for r in reference])
+        ref = {name: np.full(len(keys), np.nan) for name in tolerances}
+        if found.any():
+            ref_matrix, found_metrics = series_metrics([ns_to_ms(r) for r, f in zip(reference, found) if f])
+            for name in tolerances:
+                ref[name][found] = found_metrics[name]
+            p_ks[found] = ks_2samp_rows(new_matrix[found], ref_matrix)
+
+    rows = []
+    for i, (config, bench) in enumerate(keys):
+        row = {'configuration': config, 'benchmark': bench,
+               'count': int(np.count_nonzero(~np.isnan(new_matrix[i])))}
+        failed = []
+        for name, tolerance in tolerances.items():
+            change = new[name][i] / ref[name][i] - 1 if found[i] else np.nan
+            row[f"{name}_change"] = change
+            if change > tolerance:
+                failed.append(name)
+        row['p_ks'] = p_ks[i]
+        if not found[i]:
+            row['status'] = 'NOREF'
+        elif failed:
+            row['status'] = 'FAIL'
+        elif p_ks[i] < alpha and row['median_change'] >= 0:
+            row['status'] = 'SHIFT'
+        else:
+            row['status'] = 'ok'
+        row['failed'] = ','.join(failed)
+        rows.append(row)
+    return rows
+
+def format_table(rows):
+    lines = [f"{'config':<10}{'benchmark':<16}{'n':>6}{'median':>9}{'p99':>9}{'max':>9}{'p_ks':>9}  status"]
+    for r in rows:
+        changes = ''.join(f"{r[f'{m}_change']:>+9.1%}" if not np.isnan(r[f'{m}_change']) else f"{'-':>9}"
+                          for m in default_tolerances)
+        p_ks = f"{r['p_ks']:>9.3g}" if not np.isnan(r['p_ks']) else f"{'-':>9}"
+        lines.append(f"{r['configuration']:<10}{r['benchmark']:<16}{r['count']:>6}{changes}{p_ks}  "
+                     f"{r['status']} {r['failed']}".rstrip())
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check fresh UART logs for execution time regressions.")
+    parser.add_argument('logs', nargs='+', help="fresh UART log files")
+    parser.add_argument('--reference', default='../ZIC-APU', help="solution directory holding the reference")
+    parser.add_argument('--config', help="configuration for all logs (default: derived from each log name)")
+    parser.add_argument('--from-stats', action='store_true',
+                        help="compare against the stats cache instead of the sample store")
+    parser.add_argument('--median-tol', type=float, default=default_tolerances['median'],
+                        help="tolerated relative increase of the median")
+    parser.add_argument('--p99-tol', type=float, default=default_tolerances['p99'],
+                        help="tolerated relative increase of the p99")
+    parser.add_argument('--max-tol', type=float, default=default_tolerances['max'],
+                        help="tolerated relative increase of the max")
+    parser.add_argument('--alpha', type=float, default=0.01, help="significance level of the KS test")
+    parser.add_argument('--strict', action='store_true', help="also fail on distribution shifts")
+    parser.add_argument('--allow-noref', action='store_true',
+                        help="do not fail on benchmarks missing from the reference")
+    args = parser.parse_args()
+
+    tolerances = {'median': args.median_tol, 'p99': args.p99_tol, 'max': args.max_tol}
+    rows = check_regressions(read_fresh_logs(args.logs, args.config), args.reference, tolerances,
+                             args.alpha, args.from_stats)
+    if not rows:
+        print("No benchmark results found in the logs.")
+        sys.exit(2)
+    print(format_table(rows))
+
+    failing = {'FAIL', 'SHIFT'} if args.strict else {'FAIL'}
+    if not args.allow_noref:
+        failing.add('NOREF')
+    counts = {status: sum(r['status'] == status for r in rows) for status in ('ok', 'SHIFT', 'FAIL', 'NOREF')}
+    print(', '.join(f"{n} {status}" for status, n in counts.items()))
+    if counts['NOREF'] == len(rows):
+        print(f"No benchmark of the logs has a reference in {args.reference}.")
+        sys.exit(2)
+    sys.exit(1 if any(r['status'] in failing for r in rows) else 0)
+
+if __name__ == "__main__":
+    main()
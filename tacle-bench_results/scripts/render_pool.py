@@ -0,0 +1,104 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+# Figures are only saved to disk, never shown: workers must not need a display.
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from plot_manifest import PlotManifest, plan_figures
+
+def render_all(benchmark, plot_functions, *args):
+    """
+    Calls every plot function for one benchmark. A figure that fails is
+    reported and closed, and the remaining figures are still rendered.
+    Returns {function name: error message} for the failed figures.
+    """
+    errors = {}
+    for plot_function in plot_functions:
+        try:
+            plot_function(benchmark, *args)
+        except Exception as e:
+            plt.close('all')
+            errors[plot_function.__name__] = str(e)
+            print(f"Error in {plot_function.__name__} for benchmark '{benchmark}': {e}")
+            traceback.print_exc()
+    return errors
+
+def run_render_tasks(tasks, jobs=1, initializer=None, initargs=()):
+    """
+    Renders a list of (benchmark, plot_functions, args) tasks, in a pool of
+    `jobs` processes when jobs > 1. The arrays in args are sent to the workers
+    as they are, so no worker reads any sample file. initializer(*initargs)
+    runs in every worker first, e.g. to set the output directories. Returns
+    {benchmark: {function name: error}} for the benchmarks that had at least
+    one failing figure.
+    """
+    failures = {}
+    if jobs is None or jobs <= 1:
+        for benchmark, plot_functions, args in tasks:
+            errors = render_all(benchmark, plot_functions, *args)
+            if errors:
+                failures[benchmark] = errors
+        return failures
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=initargs) as executor:
+        futures = {executor.submit(render_all, benchmark, plot_functions, *args): benchmark
+                   for benchmark, plot_functions, args in tasks}
+        for future in as_completed(futures):
+            benchmark = futures[future]
+            try:
+                errors = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. out of memory).
+                errors = {'worker': str(e)}
+                print(f"Error rendering benchmark '{benchmark}': {e}")
+            if errors:
+                failures[benchmark] = errors
+    return failures
+
+def render_stale_figures(plots_base_dir, plot_types, plot_functions, params, items, jobs=1, force=False,
+                         initializer=None, initargs=()):
+    """
+    Renders only the figures whose inputs changed since the last run.
+    items is a list of (benchmark, args); args are both the plot function
+    arguments and the inputs hashed into the manifest of plots_base_dir.
+    Figures are saved as <plot_types[type]>/<benchmark>_<type>.png.
+    """
+    manifest = PlotManifest(plots_base_dir)
+    tasks = []
+    planned = []
+    for benchmark, args in items:
+        save_paths = {plot_type: os.path.join(plot_types[plot_type], f"{benchmark}_{plot_type}.png")
+                      for plot_type in plot_functions}
+        stale = plan_figures(manifest, benchmark, plot_functions, save_paths, params, args, force)
+        if not stale:
+            print(f"Plots for benchmark '{benchmark}' are up to date")
+            continue
+        tasks.append((benchmark, [plot_function for _, plot_function, _ in stale], args))
+        planned.append((benchmark, save_paths, stale))
+
+    failures = run_render_tasks(tasks, jobs, initializer, initargs)
+    for benchmark, save_paths, stale in planned:
+        failed = failures.get(benchmark, {})
+        if 'worker' in failed:
+            continue
+        for plot_type, plot_function, digest in stale:
+            if plot_function.__name__ not in failed:
+                manifest.record(save_paths[plot_type], digest)
+    manifest.save()
+    rendered = sum(len(stale) for _, _, stale in planned)
+    print(f"{rendered} figure(s) rendered, {len(items) * len(plot_functions) - rendered} up to date")
+    return failures
+
+def report_failures(failures):
+    if not failures:
+        return
+    print(f"{len(failures)} benchmark(s) had figures that failed to render:")
+    for benchmark, errors in sorted(failures.items()):
+        for name, error in sorted(errors.items()):
+            print(f"  {benchmark} ({name}): {error}")
+
+def default_jobs():
+    return os.cpu_count() or 1
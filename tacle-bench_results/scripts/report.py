@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Writes one self-contained HTML report of every (solution, configuration,
+benchmark) instead of browsing the hundreds of PNGs.
+
+Only pre-aggregated data is embedded: quantiles, the downsampled series
+(see downsample.py), a CDF on a quantile grid and the cached density curve
+(see density.py), rounded to 4 significant digits. The page filters by
+benchmark, configuration and solution and draws the line, CDF and violin
+views as SVG in the browser, so it needs no server and no external script.
+All times are in milliseconds.
+
+Example:
+    python report.py --output ../report.html
+"""
+import os
+import json
+import argparse
+import numpy as np
+
+from density import solution_curves
+from downsample import cdf_points, downsample_series
+from sample_store import load_samples, ns_to_ms, solutions
+
+# Report written by default, next to the solution directories.
+default_output = '../report.html'
+
+# Point budgets of the embedded curves.
+report_line_points = 300
+report_cdf_points = 100
+report_kde_points = 64
+
+# Quantiles listed in the summary table.
+report_quantiles = [0, 1, 5, 25, 50, 75, 95, 99, 100]
+
+def rounded(values):
+    return [float(f"{v:.4g}") for v in np.asarray(values, dtype=float)]
+
+def summarize_series(exec_times, curve):
+    """Embedded summary of one ms array."""
+    sample_index, values = downsample_series(exec_times, report_line_points)
+    cdf_x, cdf_p = cdf_points(exec_times, report_cdf_points)
+    grid = np.linspace(curve[0][0], curve[0][-1], report_kde_points)
+    summary = {
+        'n': int(len(exec_times)),
+        'mean': rounded([np.mean(exec_times)])[0],
+        'q': rounded(np.percentile(exec_times, report_quantiles)),
+        'y': rounded(values),
+        'cx': rounded(cdf_x),
+        'cp': rounded(cdf_p),
+        'kx': rounded(grid),
+        'kd': rounded(np.interp(grid, curve[0], curve[1])),
+    }
+    # Sample indices are only needed when the series was downsampled.
+    if len(values) < len(exec_times):
+        summary['x'] = [int(i) for i in sample_index]
+    return summary
+
+def build_report_data(data, sols=None):
+    """
+    Pre-aggregates data[solution][configuration][benchmark] for the page;
+    sols maps the solution names to their directories (for the density cache).
+    """
+    sols = sols or solutions
+    series = []
+    benchmarks = set()
+    configs = []
+    for sol_name, sol_data in data.items():
+        curves = solution_curves(sols[sol_name])
+        for config, benches in sol_data.items():
+            if config not in configs:
+                configs.append(config)
+            for bench, exec_times in sorted(benches.items()):
+                if not len(exec_times):
+                    continue
+                entry = summarize_series(ns_to_ms(exec_times), curves[f"{config}/{bench}"])
+                entry.update({'s': sol_name, 'c': config, 'b': bench})
+                series.append(entry)
+                benchmarks.add(bench)
+    return {
+        'solutions': list(data),
+        'configurations': configs,
+        'benchmarks': sorted(benchmarks),
+        'quantiles': report_quantiles,
+        'series': series,
+    }
+
+page_template = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Execution time report</title>
+<style>
+body { font-family: sans-serif; margin: 1em; font-size: 13px; }
+fieldset { display: inline-block; vertical-align: top; margin-right: 1em; }
+select[multiple] { min-width: 10em; }
+svg { border: 1px solid #ccc; margin: 0.5em 0.5em 0 0; }
+table { border-collapse: collapse; margin-top: 1em; }
+th, td { border: 1px solid #ddd; padding: 2px 6px; text-align: right; }
+th { background: #f4f4f4; cursor: pointer; }
+td.key { text-align: left; }
+.axis { stroke: #444; } .grid { stroke: #eee; } text { font-size: 10px; }
+</style></head><body>
+<h2>Execution time report</h2>
+<fieldset><legend>Benchmark</legend><select id="bench"></select></fieldset>
+<fieldset><legend>Configuration</legend><select id="config" multiple size="6"></select></fieldset>
+<fieldset><legend>Solution</legend><select id="sol" multiple size="6"></select></fieldset>
+<fieldset><legend>Table</legend><label><input type="checkbox" id="allbench"> all benchmarks</label></fieldset>
+<div id="charts"></div>
+<table id="table"></table>
+<script>
+const DATA = __DATA__;
+const COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f',
+                '#bcbd22', '#17becf', '#aec7e8', '#ffbb78'];
+const $ = id => document.getElementById(id);
+function fill(select, values, all) {
+  for (const v of values) { const o = new Option(v, v); o.selected = all; select.add(o); }
+}
+fill($('bench'), DATA.benchmarks, false);
+fill($('config'), DATA.configurations, true);
+fill($('sol'), DATA.solutions, true);
+const chosen = s => Array.from(s.selectedOptions, o => o.value);
+
+function svgEl(tag, attrs, parent) {
+  const e = document.createElementNS('http://www.w3.org/2000/svg', tag);
+  for (const k in attrs) e.setAttribute(k, attrs[k]);
+  if (parent) parent.appendChild(e);
+  return e;
+}
+function ticks(lo, hi, n) {
+  const step = Math.pow(10, Math.floor(Math.log10((hi - lo) / n || 1)));
+  const nice = [1, 2, 5, 10].map(m => m * step).find(s => (hi - lo) / s <= n) || step * 10;
+  const out = [];
+  for (let t = Math.ceil(lo / nice) * nice; t <= hi + 1e-12; t += nice) out.push(+t.toPrecision(6));
+  return out;
+}
+// One SVG chart with linear axes; draw(svg, sx, sy) adds the marks in data coordinates.
+function chart(title, xlabel, ylabel, xr, yr, draw, legend) {
+  const W = 460, H = 300, L = 60, R = 10, T = 24, B = 40;
+  const svg = svgEl('svg', {width: W, height: H});
+  const sx = x => L + (x - xr[0]) / (xr[1] - xr[0] || 1) * (W - L - R);
+  const sy = y => H - B - (y - yr[0]) / (yr[1] - yr[0] || 1) * (H - T - B);
+  for (const t of ticks(xr[0], xr[1], 6)) {
+    svgEl('line', {x1: sx(t), x2: sx(t), y1: T, y2: H - B, class: 'grid'}, svg);
+    svgEl('text', {x: sx(t), y: H - B + 12, 'text-anchor': 'middle'}, svg).textContent = t;
+  }
+  for (const t of ticks(yr[0], yr[1], 5)) {
+    svgEl('line', {x1: L, x2: W - R, y1: sy(t), y2: sy(t), class: 'grid'}, svg);
+    svgEl('text', {x: L - 4, y: sy(t) + 3, 'text-anchor': 'end'}, svg).textContent = t;
+  }
+  svgEl('rect', {x: L, y: T, width: W - L - R, height: H - T - B, fill: 'none', class: 'axis'}, svg);
+  svgEl('text', {x: W / 2, y: 14, 'text-anchor': 'middle', 'font-weight': 'bold'}, svg).textContent = title;
+  svgEl('text', {x: W / 2, y: H - 6, 'text-anchor': 'middle'}, svg).textContent = xlabel;
+  svgEl('text', {x: 12, y: H / 2, transform: `rotate(-90 12 ${H / 2})`, 'text-anchor': 'middle'}, svg)
+    .textContent = ylabel;
+  draw(svg, sx, sy);
+  legend.forEach(([label, color], i) => {
+    svgEl('rect', {x: L + 6, y: T + 6 + i * 12, width: 8, height: 8, fill: color}, svg);
+    svgEl('text', {x: L + 18, y: T + 13 + i * 12}, svg).textContent = label;
+  });
+  return svg;
+}
+function path(svg, xs, ys, sx, sy, color) {
+  const d = xs.map((x, i) => (i ? 'L' : 'M') + sx(x).toFixed(1) + ',' + sy(ys[i]).toFixed(1)).join('');
+  svgEl('path', {d: d, fill: 'none', stroke: color, 'stroke-width': 1.2}, svg);
+}
+const range = arrays => [Math.min(...arrays.map(a => Math.min(...a))), Math.max(...arrays.map(a => Math.max(...a)))];
+
+function selected(allBenchmarks) {
+  const configs = chosen($('config')), sols = chosen($('sol')), bench = $('bench').value;
+  return DATA.series.filter(s => configs.includes(s.c) && sols.includes(s.s) && (allBenchmarks || s.b === bench));
+}
+function drawCharts() {
+  const charts = $('charts');
+  charts.innerHTML = '';
+  const rows = selected(false);
+  if (!rows.length) { charts.textContent = 'No series selected.'; return; }
+  const legend = rows.map((s, i) => [s.s + ' / ' + s.c, COLORS[i % COLORS.length]]);
+  const xs = rows.map(s => s.x || s.y.map((_, i) => i));
+  const yr = range(rows.map(s => s.y));
+  charts.appendChild(chart('Samples', 'Sample index', 'Execution time (ms)', range(xs), yr, (svg, sx, sy) =>
+    rows.forEach((s, i) => path(svg, xs[i], s.y, sx, sy, legend[i][1])), legend));
+  charts.appendChild(chart('CDF', 'Execution time (ms)', 'Cumulative probability', range(rows.map(s => s.cx)), [0, 1],
+    (svg, sx, sy) => rows.forEach((s, i) => path(svg, s.cx, s.cp, sx, sy, legend[i][1])), legend));
+  charts.appendChild(chart('Violins', 'Series', 'Execution time (ms)', [-0.5, rows.length - 0.5], yr,
+    (svg, sx, sy) => rows.forEach((s, i) => {
+      const top = Math.max(...s.kd), half = 0.4 * (sx(1) - sx(0));
+      const keep = s.kx.map((x, j) => j).filter(j => s.kx[j] >= s.q[0] && s.kx[j] <= s.q[s.q.length - 1]);
+      const pts = keep.map(j => [sx(i) + s.kd[j] / top * half, sy(s.kx[j])])
+        .concat(keep.slice().reverse().map(j => [sx(i) - s.kd[j] / top * half, sy(s.kx[j])]));
+      if (pts.length) svgEl('polygon', {points: pts.map(p => p.map(v => v.toFixed(1)).join(',')).join(' '),
+        fill: legend[i][1], 'fill-opacity': 0.4, stroke: legend[i][1]}, svg);
+      const median = s.q[DATA.quantiles.indexOf(50)];
+      svgEl('line', {x1: sx(i) - half / 2, x2: sx(i) + half / 2, y1: sy(median), y2: sy(median),
+        stroke: legend[i][1], 'stroke-width': 2}, svg);
+    }), legend));
+}
+let sortKey = null, sortDir = 1;
+function drawTable() {
+  const rows = selected($('allbench').checked);
+  const head = ['benchmark', 'configuration', 'solution', 'n', 'mean'].concat(DATA.quantiles.map(q =>
+    q === 0 ? 'min' : q === 100 ? 'max' : 'p' + q));
+  const values = s => [s.b, s.c, s.s, s.n, s.mean].concat(s.q);
+  if (sortKey !== null) rows.sort((a, b) => {
+    const x = values(a)[sortKey], y = values(b)[sortKey];
+    return (x < y ? -1 : x > y ? 1 : 0) * sortDir;
+  });
+  const table = $('table');
+  table.innerHTML = '';
+  const tr = table.insertRow();
+  head.forEach((h, k) => {
+    const th = document.createElement('th');
+    th.textContent = h;
+    th.onclick = () => { sortDir = sortKey === k ? -sortDir : 1; sortKey = k; drawTable(); };
+    tr.appendChild(th);
+  });
+  for (const s of rows) {
+    const r = table.insertRow();
+    values(s).forEach((v, k) => { const c = r.insertCell(); c.textContent = v; if (k < 3) c.className = 'key'; });
+  }
+}
+function update() { drawCharts(); drawTable(); }
+for (const id of ['bench', 'config', 'sol', 'allbench']) $(id).onchange = update;
+update();
+</script></body></html>
+"""
+
+def write_report(report_data, output_path):
+    # "</" must not appear inside the inline script.
+    payload = json.dumps(report_data, separators=(',', ':')).replace('</', '<\\/')
+    with open(output_path, 'w') as f:
+        f.write(page_template.replace('__DATA__', payload))
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a self-contained interactive HTML report.")
+    parser.add_argument('--output', default=default_output, help="HTML file to write")
+    args = parser.parse_args()
+
+    report_data = build_report_data(load_samples(solutions))
+    if not report_data['series']:
+        print("No samples found.")
+        return
+    write_report(report_data, args.output)
+    print(f"Report of {len(report_data['series'])} series written to {args.output} "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import os
+import json
+import warnings
+import numpy as np
+
+# Solutions and configurations shared by every script.
+solutions = {
+    "Preempt-RT": "../Preempt-RT-containers",
+    "ZIC-APU": "../ZIC-APU"
+}
+configurations = ['baseline', 'cpu8', 'fork8', 'memcpy8', 'open8', 'udp8']
+
+# Suffixes of the per-benchmark sample files, in order of preference.
+sample_suffixes = ('_results.txt', '_execution_time.txt')
+
+# Name of the columnar store written inside each solution directory.
+store_filename = 'samples.npz'
+
+# Key holding the fingerprint of the text files the store was built from.
+sources_key = '__sources__'
+
+# Prefix of the lines appended by the statistics scripts; they are not samples.
+statistics_prefix = b'Statistics -'
+
+def detect_unit(content):
+    """
+    Detects the unit of a whole file at once: 'ns' when its samples are
+    written as "NNN ns", 's' when they are plain numbers in seconds.
+    """
+    return 'ns' if b'ns' in content else 's'
+
+def strip_statistics_lines(content):
+    """Removes every "Statistics -" line, jumping between them with bytes.find."""
+    pieces = []
+    start = 0
+    while True:
+        found = content.find(statistics_prefix, start)
+        if found < 0:
+            break
+        pieces.append(content[start:found])
+        start = content.find(b'\n', found)
+        if start < 0:
+            start = len(content)
+    pieces.append(content[start:])
+    return b''.join(pieces)
+
+def parse_numbers(content, dtype):
+    """
+    Parses whitespace-separated numbers in C with a single NumPy call.
+    Raises ValueError if any token is not a number of the given dtype.
+    """
+    with warnings.catch_warnings():
+        # Older NumPy only warns (DeprecationWarning) when parsing stops early.
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            return np.fromstring(content, dtype=dtype, sep=' ')
+        except DeprecationWarning as e:
+            raise ValueError(str(e))
+
+def parse_execution_times(content):
+    """
+    Converts the bytes of a sample file to an int64 nanosecond array.
+    The unit is detected once for the whole file and every value is converted
+    in one NumPy operation. Raises ValueError on a malformed token.
+    """
+    content = strip_statistics_lines(content)
+    if not content.strip():
+        return np.empty(0, dtype=np.int64)
+    if detect_unit(content) == 'ns':
+        content = content.replace(b'ns', b'')
+        try:
+            return parse_numbers(content, np.int64)
+        except ValueError:
+            # Fractional nanoseconds: parse as floats and round.
+            return np.rint(parse_numbers(content, np.float64)).astype(np.int64)
+    return np.rint(parse_numbers(content, np.float64) * 1e9).astype(np.int64)
+
+def parse_execution_times_by_line(content, file_path):
+    """
+    Slow path for files with malformed lines: parses line by line and skips
+    (and reports) the lines that are not a sample.
+    """
+    execution_times = []
+    for line in content.decode(errors='replace').splitlines():
+        line = line.strip()
+        if not line or line.startswith("Statistics -"):
+            continue
+        try:
+            if line.endswith('ns'):
+                execution_times.append(round(float(line[:-2])))
+            else:
+                execution_times.append(round(float(line) * 1e9))
+        except ValueError as conv_err:
+            print(f"Error processing line '{line}' in {file_path}: {conv_err}")
+    return np.array(execution_times, dtype=np.int64)
+
+def parse_execution_times_checked(content, file_path):
+    """parse_execution_times, falling back to the line-by-line parser on malformed content."""
+    try:
+        return parse_execution_times(content)
+    except ValueError:
+        return parse_execution_times_by_line(content, file_path)
+
+def read_execution_times(file_path):
+    """
+    Reads the execution times from a file and returns them as int64 nanoseconds.
+    Expected formats (detected once per file):
+      - "1854131 ns"  -> interpreted as nanoseconds.
+      - "1.853"       -> interpreted as seconds.
+    Lines starting with "Statistics -" are skipped.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return np.empty(0, dtype=np.int64)
+    return parse_execution_times_checked(content, file_path)
+
+def find_benchmark_files(solution_dir, configuration):
+    """
+    Returns a dictionary mapping benchmark names to file paths for a given
+    solution's configuration directory. It looks for files ending with either
+    '_results.txt' or '_execution_time.txt', preferring the former.
+    """
+    benchmark_files = {}
+    config_dir = os.path.join(solution_dir, configuration)
+    if not os.path.isdir(config_dir):
+        return benchmark_files
+    for f in sorted(os.listdir(config_dir)):
+        for suffix in sample_suffixes:
+            if f.endswith(suffix):
+                benchmark = f[:-len(suffix)]
+                if suffix == sample_suffixes[0] or benchmark not in benchmark_files:
+                    benchmark_files[benchmark] = os.path.join(config_dir, f)
+                break
+    return benchmark_files
+
+def discover_configurations(solution_dir):
+    """
+    Configuration folders of a solution: its sub-directories holding at least
+    one sample file. Known configurations come first, in their usual order.
+    """
+    if not os.path.isdir(solution_dir):
+        return []
+    found = [d for d in sorted(os.listdir(solution_dir)) if find_benchmark_files(solution_dir, d)]
+    return [c for c in configurations if c in found] + [c for c in found if c not in configurations]
+
+def discover_solutions(root):
+    """
+    Returns {name: path} of the sub-directories of root that hold at least one
+    configuration. Known solution directories keep their usual names.
+    """
+    known_names = {os.path.basename(path): name for name, path in solutions.items()}
+    found = {}
+    for entry in sorted(os.listdir(root)):
+        path = os.path.join(root, entry)
+        if os.path.isdir(path) and discover_configurations(path):
+            found[known_names.get(entry, entry)] = path
+    return found
+
+def source_fingerprint(solution_dir, configs=None):
+    """
+    Returns a description (path, size, mtime) of every sample file of a solution.
+    Only stat() is used, so checking freshness never opens the text files.
+    """
+    fingerprint = []
+    for config in configs or discover_configurations(solution_dir):
+        for bench, file_path in sorted(find_benchmark_files(solution_dir, config).items()):
+            st = os.stat(file_path)
+            fingerprint.append([config, bench, st.st_size, st.st_mtime_ns])
+    return fingerprint
+
+def store_path(solution_dir):
+    return os.path.join(solution_dir, store_filename)
+
+def build_store(solution_dir, fingerprint=None):
+    """
+    Parses every sample file of a solution once and writes them into a single
+    compressed .npz, one int64 nanosecond array per "<configuration>/<benchmark>".
+    """
+    if fingerprint is None:
+        fingerprint = source_fingerprint(solution_dir)
+    arrays = {}
+    for config in discover_configurations(solution_dir):
+        for bench, file_path in find_benchmark_files(solution_dir, config).items():
+            exec_times = read_execution_times(file_path)
+            if exec_times.size:
+                arrays[f"{config}/{bench}"] = exec_times
+            else:
+                print(f"No valid data in {file_path}")
+    arrays[sources_key] = np.array(json.dumps(fingerprint))
+    path = store_path(solution_dir)
+    np.savez_compressed(path, **arrays)
+    print(f"Sample store written to {path} ({len(arrays) - 1} series)")
+    return path
+
+def open_store(solution_dir):
+    """
+    Opens the store of a solution, (re)building it first if any sample file
+    was added or changed since it was written. Arrays are read lazily on access.
+    """
+    path = store_path(solution_dir)
+    fingerprint = source_fingerprint(solution_dir)
+    if os.path.exists(path):
+        store = np.load(path)
+        try:
+            if sources_key in store.files and json.loads(str(store[sources_key])) == fingerprint:
+                return store
+        except ValueError:
+            pass
+        store.close()
+    build_store(solution_dir, fingerprint)
+    return np.load(path)
+
+# Shards (sessions) every loaded series is restricted to, set by select_shards.
+shard_selection = None
+
+def select_shards(include=None, exclude=None):
+    """
+    Restricts the series loaded from now on to the samples of the shards
+    matching the include patterns and none of the exclude patterns (see
+    shards.py). With neither, every sample is used again.
+    """
+    global shard_selection
+    shard_selection = {'include': include or [], 'exclude': exclude or []} if include or exclude else None
+    open_stores.clear()
+
+def shard_view(solution_dir, store):
+    """The store itself, or a view of it restricted to the selected shards."""
+    if shard_selection is None:
+        return store
+    from shards import ShardView
+    return ShardView(solution_dir, store, shard_selection)
+
+# Stores opened by get_store, one per solution directory.
+open_stores = {}
+
+def get_store(solution_dir):
+    """Memoized open_store: the freshness check runs once per solution and process."""
+    if solution_dir not in open_stores:
+        open_stores[solution_dir] = shard_view(solution_dir, open_store(solution_dir))
+    return open_stores[solution_dir]
+
+def list_benchmarks(solution_dir, configs=None):
+    """Benchmark names present in the store, read from its index without loading any array."""
+    configs = configs or discover_configurations(solution_dir)
+    benchmarks = set()
+    for key in get_store(solution_dir).files:
+        if key != sources_key:
+            config, bench = key.split('/', 1)
+            if config in configs:
+                benchmarks.add(bench)
+    return benchmarks
+
+def load_series(solution_dir, config, benchmark):
+    """Returns the int64 ns array of one (configuration, benchmark), or None if absent."""
+    store = get_store(solution_dir)
+    key = f"{config}/{benchmark}"
+    return store[key] if key in store.files else None
+
+def load_solution(solution_dir, configs=None):
+    """
+    Returns data[configuration][benchmark] = int64 ns array for one solution,
+    of every discovered configuration unless configs is given.
+    """
+    configs = configs or discover_configurations(solution_dir)
+    data = {config: {} for config in configs}
+    with shard_view(solution_dir, open_store(solution_dir)) as store:
+        for key in store.files:
+            if key == sources_key:
+                continue
+            config, bench = key.split('/', 1)
+            if config in data:
+                data[config][bench] = store[key]
+    return data
+
+def load_samples(sols=None, configs=None):
+    """
+    Returns data[solution][configuration][benchmark] = int64 ns array.
+    """
+    sols = sols or solutions
+    return {sol_name: load_solution(sol_dir, configs) for sol_name, sol_dir in sols.items()}
+
+def ns_to_ms(exec_times):
+    """Converts an int64 nanosecond array to float64 milliseconds."""
+    return np.asarray(exec_times, dtype=np.float64) / 1e6
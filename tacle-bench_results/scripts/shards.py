@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Shards are the capture sessions a series was assembled from: one per UART
+log, split further when the board rebooted within a log ("udp8_uart_log2.txt",
+"udp8_uart_log2.txt#1", ...). Samples without a provenance record (extracted
+by hand before ingest.py wrote one) belong to the 'unknown' shard.
+
+The provenance files written by ingest.py are collected, aligned with the
+sample store, into provenance.npz next to it: for every series, the shard,
+log line and kernel timestamp of each sample. It is rebuilt when the store
+or a provenance file changes.
+
+The consistency analysis ranks every series once and runs a Kruskal-Wallis
+test across its shards for all series together, then gives every shard its
+Cliff's delta against the other shards of the series (positive: slower).
+A shard is shifted when the series differs significantly after correction
+and its delta is large; a session is flagged when it is shifted in at least
+session_fraction of the benchmarks it was tested on.
+
+select_shards in sample_store.py restricts every later load to some shards,
+through the ShardView below, without reading the logs again.
+
+Example:
+    python shards.py --alpha 0.01
+"""
+import os
+import csv
+import json
+import math
+import fnmatch
+import argparse
+import numpy as np
+
+from ingest import provenance_suffix
+from pwcet import normal_sf
+from sample_store import configurations, ns_to_ms, open_store, solutions, sources_key
+from significance import adjust_p_values
+from tail_stats import pad_series
+
+# Table written by default, next to the solution directories.
+default_output = '../shard_consistency.csv'
+
+# Provenance of the samples, written inside each solution directory.
+provenance_filename = 'provenance.npz'
+
+# Key holding the JSON list of shard names; shard indices point into it.
+shards_key = '__shards__'
+
+# Shard of the samples without a provenance record.
+unknown_shard = 'unknown'
+
+# Shards with fewer samples of a benchmark are left out of its test.
+min_shard_samples = 5
+
+# |Cliff's delta| from which a shard counts as shifted (a large effect).
+delta_threshold = 0.474
+
+# A session is flagged when it is shifted in at least this share of its benchmarks.
+session_fraction = 0.5
+
+def provenance_file(solution_dir, key):
+    config, bench = key.split('/', 1)
+    return os.path.join(solution_dir, config, f"{bench}{provenance_suffix}")
+
+def provenance_fingerprint(solution_dir, store):
+    """The store's sources plus (series, size, mtime) of every provenance file."""
+    files = []
+    for key in store.files:
+        if key != sources_key and os.path.exists(provenance_file(solution_dir, key)):
+            st = os.stat(provenance_file(solution_dir, key))
+            files.append([key, st.st_size, st.st_mtime_ns])
+    return json.dumps([str(store[sources_key]), files])
+
+def read_provenance_file(path):
+    """Returns the (shard names, lines, timestamps) columns of one provenance file."""
+    with open(path, 'rb') as f:
+        fields = np.array(f.read().split()).reshape(-1, 4)
+    logs = fields[:, 0].astype(str)
+    boots = fields[:, 1].astype(np.int64)
+    names = np.where(boots == 0, logs, np.char.add(np.char.add(logs, '#'), boots.astype(str)))
+    return names, fields[:, 2].astype(np.int64), fields[:, 3].astype(float)
+
+def build_provenance(solution_dir, store, fingerprint):
+    """
+    Aligns the provenance files with the series of a store and writes the
+    provenance store. Records describe the last samples of a series: samples
+    written before provenance was recorded come first and stay unknown.
+    """
+    names = [unknown_shard]
+    arrays = {}
+    for key in store.files:
+        if key == sources_key:
+            continue
+        n = len(store[key])
+        shard = np.zeros(n, dtype=np.int16)
+        line = np.full(n, -1, dtype=np.int64)
+        timestamp = np.full(n, np.nan)
+        path = provenance_file(solution_dir, key)
+        if os.path.exists(path):
+            shard_names, lines, timestamps = read_provenance_file(path)
+            m = len(shard_names)
+            if m > n:
+                print(f"{path} has {m} records for {n} samples, ignoring it")
+            else:
+                unique, inverse = np.unique(shard_names, return_inverse=True)
+                for name in unique:
+                    if name not in names:
+                        names.append(name)
+                shard[n - m:] = np.array([names.index(name) for name in unique])[inverse]
+                line[n - m:] = lines
+                timestamp[n - m:] = timestamps
+        arrays[f"shard/{key}"] = shard
+        arrays[f"line/{key}"] = line
+        arrays[f"time/{key}"] = timestamp
+    path = os.path.join(solution_dir, provenance_filename)
+    np.savez_compressed(path, **arrays, **{shards_key: np.array(json.dumps(names)),
+                                           sources_key: np.array(fingerprint)})
+    print(f"Provenance store written to {path} ({len(names) - 1} shards)")
+    return path
+
+# Provenance loaded by solution_provenance, one per solution directory.
+loaded_provenance = {}
+
+def solution_provenance(solution_dir, store=None):
+    """
+    Returns {'shards': [name], 'series': {"<configuration>/<benchmark>":
+    (shard index, log line, kernel timestamp) arrays}} for one solution,
+    from provenance.npz when it matches the (unfiltered) sample store.
+    Memoized per process.
+    """
+    if solution_dir in loaded_provenance:
+        return loaded_provenance[solution_dir]
+    if store is None:
+        store = open_store(solution_dir)
+    fingerprint = provenance_fingerprint(solution_dir, store)
+    path = os.path.join(solution_dir, provenance_filename)
+    cache = None
+    if os.path.exists(path):
+        cache = np.load(path)
+        if str(cache[sources_key]) != fingerprint:
+            cache.close()
+            cache = None
+    if cache is None:
+        build_provenance(solution_dir, store, fingerprint)
+        cache = np.load(path)
+    with cache:
+        provenance = {
+            'shards': json.loads(str(cache[shards_key])),
+            'series': {key: (cache[f"shard/{key}"], cache[f"line/{key}"], cache[f"time/{key}"])
+                       for key in store.files if key != sources_key},
+        }
+    loaded_provenance[solution_dir] = provenance
+    return provenance
+
+def shard_mask(names, selection):
+    """Boolean per shard name: matches an include pattern (if any) and no exclude pattern."""
+    def matches(name, patterns):
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+    return np.array([(not selection['include'] or matches(name, selection['include']))
+                     and not matches(name, selection['exclude']) for name in names], dtype=bool)
+
+class ShardView:
+    """
+    Read-only view of a sample store with only the samples of the selected
+    shards. It answers like the NpzFile it wraps (files, [], with), and its
+    sources entry includes the selection, so the caches derived from a store
+    are rebuilt when the selection changes.
+    """
+    def __init__(self, solution_dir, store, selection):
+        self.store = store
+        self.selection = selection
+        provenance = solution_provenance(solution_dir, store)
+        keep = shard_mask(provenance['shards'], selection)
+        self.masks = {key: keep[shard] for key, (shard, _, _) in provenance['series'].items()}
+        self.files = [key for key in store.files if key == sources_key or self.masks[key].any()]
+
+    def __getitem__(self, key):
+        if key == sources_key:
+            return np.array(json.dumps([str(self.store[key]), self.selection]))
+        return self.store[key][self.masks[key]]
+
+    def close(self):
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def rank_rows(matrix):
+    """
+    Average ranks (1-based, ties share their mean rank) of every row of a
+    NaN-padded matrix, and the tie term sum(t^3 - t) of every row.
+    """
+    n_rows, width = matrix.shape
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    order = np.argsort(matrix, axis=1)
+    sorted_values = np.take_along_axis(matrix, order, axis=1)
+    position = np.broadcast_to(np.arange(width), matrix.shape)
+    valid = position < counts[:, None]
+    # A run of ties spans [start, end]; NaN never equals anything, so padding ends every run.
+    starts = np.ones(matrix.shape, dtype=bool)
+    starts[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    ends = np.ones(matrix.shape, dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    start = np.maximum.accumulate(np.where(starts, position, 0), axis=1)
+    end = np.minimum.accumulate(np.where(ends, position, width - 1)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.full(matrix.shape, np.nan)
+    np.put_along_axis(ranks, order, np.where(valid, (start + end) / 2 + 1, np.nan), axis=1)
+    ties = (end - start + 1).astype(float)
+    tie_term = np.where(starts & valid, ties ** 3 - ties, 0).sum(axis=1)
+    return ranks, tie_term
+
+def chi2_sf(x, df):
+    """Survival function of the chi-square distribution for integer degrees of freedom."""
+    x = np.maximum(np.asarray(x, dtype=float), 0)
+    df = np.asarray(df)
+    half = x / 2
+    odd = df % 2 == 1
+    # Even df: exp(-x/2) sum_{j=0}^{df/2-1} (x/2)^j / j!
+    # Odd df: erfc(sqrt(x/2)) + exp(-x/2) sum_{j=1}^{(df-1)/2} (x/2)^(j-1/2) / Gamma(j+1/2)
+    n_terms = np.where(odd, (df - 1) // 2, df // 2)
+    term = np.where(odd, np.sqrt(half) / math.gamma(1.5), 1.0)
+    total = np.zeros(x.shape)
+    for j in range(int(n_terms.max())):
+        total += np.where(j < n_terms, term, 0.0)
+        term = term * half / np.where(odd, j + 1.5, j + 1)
+    sf = np.exp(-half) * total + np.where(odd, normal_sf(np.sqrt(x)), 0.0)
+    return np.clip(sf, 0.0, 1.0)
+
+def kruskal_rows(matrix, groups, n_groups):
+    """
+    Kruskal-Wallis test across the groups of every row (group -1: left out).
+    Returns (H, p, rank sums, group sizes); the last two have shape (rows, n_groups).
+    """
+    matrix = np.where(groups >= 0, matrix, np.nan)
+    ranks, tie_term = rank_rows(matrix)
+    rows = np.broadcast_to(np.arange(len(matrix))[:, None], matrix.shape)
+    used = groups >= 0
+    cells = (rows * n_groups + groups)[used]
+    rank_sums = np.bincount(cells, ranks[used], minlength=len(matrix) * n_groups).reshape(-1, n_groups)
+    sizes = np.bincount(cells, minlength=len(matrix) * n_groups).reshape(-1, n_groups)
+    n = sizes.sum(axis=1).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = (12 / (n * (n + 1)) * np.where(sizes > 0, rank_sums ** 2 / sizes, 0).sum(axis=1)
+             - 3 * (n + 1))
+        correction = 1 - tie_term / (n ** 3 - n)
+        # Rows where every sample is tied carry no evidence.
+        h = np.where(correction > 0, h / correction, 0.0)
+    k = np.count_nonzero(sizes, axis=1)
+    p = np.where(k > 1, chi2_sf(h, np.maximum(k - 1, 1)), 1.0)
+    return h, p, rank_sums, sizes
+
+def cliffs_delta(rank_sums, sizes):
+    """Cliff's delta of each group against the rest of its row, from the rank sums."""
+    n = sizes.sum(axis=1, keepdims=True)
+    u = rank_sums - sizes * (sizes + 1) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 2 * u / (sizes * (n - sizes)) - 1
+
+def shard_series(sols, configs):
+    """
+    Series split into at least two testable shards. Returns keys
+    (solution, configuration, benchmark), ms arrays, per-sample group
+    indices (-1: not tested) and the shard names of the groups of each series.
+    """
+    keys, series, groups, names = [], [], [], []
+    for sol_name, sol_dir in sols.items():
+        store = open_store(sol_dir)
+        provenance = solution_provenance(sol_dir, store)
+        for config in configs:
+            for key in sorted(k for k in provenance['series'] if k.split('/', 1)[0] == config):
+                shard = provenance['series'][key][0]
+                ids, counts = np.unique(shard, return_counts=True)
+                tested = ids[(counts >= min_shard_samples) & (ids != 0)]
+                if len(tested) < 2:
+                    continue
+                lookup = np.full(len(provenance['shards']), -1)
+                lookup[tested] = np.arange(len(tested))
+                keys.append((sol_name, config, key.split('/', 1)[1]))
+                series.append(ns_to_ms(store[key]))
+                groups.append(lookup[shard])
+                names.append([provenance['shards'][i] for i in tested])
+    return keys, series, groups, names
+
+def shard_consistency(sols=None, configs=None, alpha=0.01, correction='bh', threshold=delta_threshold):
+    """One row dict per (series, shard) tested, sorted by series."""
+    keys, series, groups, names = shard_series(sols or solutions, configs or configurations)
+    if not keys:
+        return []
+    matrix = pad_series(series)
+    group_matrix = np.full(matrix.shape, -1)
+    for row, g in enumerate(groups):
+        group_matrix[row, :len(g)] = g
+    n_groups = max(len(n) for n in names)
+    h, p, rank_sums, sizes = kruskal_rows(matrix, group_matrix, n_groups)
+    p_adj = adjust_p_values(p, correction)
+    delta = cliffs_delta(rank_sums, sizes)
+    epsilon_squared = h / (sizes.sum(axis=1) - 1)
+
+    rows = []
+    for i, (sol_name, config, bench) in enumerate(keys):
+        pooled_median = np.median(series[i][groups[i] >= 0])
+        for g, shard in enumerate(names[i]):
+            values = series[i][groups[i] == g]
+            rows.append({
+                'solution': sol_name,
+                'configuration': config,
+                'benchmark': bench,
+                'shard': shard,
+                'samples': int(sizes[i, g]),
+                'median_ms': float(np.median(values)),
+                'median_shift': float(np.median(values) / pooled_median - 1),
+                'cliffs_delta': float(delta[i, g]),
+                'epsilon_squared': float(epsilon_squared[i]),
+                'p_kruskal': float(p[i]),
+                'p_kruskal_adj': float(p_adj[i]),
+                'shifted': bool(p_adj[i] < alpha and abs(delta[i, g]) >= threshold),
+            })
+    return rows
+
+def session_summary(rows, fraction=session_fraction):
+    """Per (solution, shard): benchmarks tested and shifted, median delta, and whether it is flagged."""
+    sessions = {}
+    for r in rows:
+        sessions.setdefault((r['solution'], r['shard']), []).append(r)
+    summary = []
+    for (sol_name, shard), shard_rows in sessions.items():
+        shifted = sum(r['shifted'] for r in shard_rows)
+        summary.append({
+            'solution': sol_name,
+            'shard': shard,
+            'benchmarks': len(shard_rows),
+            'shifted': shifted,
+            'median_delta': float(np.median([r['cliffs_delta'] for r in shard_rows])),
+            'flagged': shifted >= fraction * len(shard_rows),
+        })
+    summary.sort(key=lambda s: (not s['flagged'], -s['shifted'] / s['benchmarks']))
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the capture sessions of every benchmark.")
+    parser.add_argument('--alpha', type=float, default=0.01, help="significance level after correction")
+    parser.add_argument('--correction', choices=['bh', 'holm'], default='bh',
+                        help="multiple-comparison correction (Benjamini-Hochberg or Holm)")
+    parser.add_argument('--delta', type=float, default=delta_threshold,
+                        help="|Cliff's delta| from which a shard counts as shifted")
+    parser.add_argument('--output', default=default_output, help="CSV file to write")
+    args = parser.parse_args()
+
+    rows = shard_consistency(alpha=args.alpha, correction=args.correction, threshold=args.delta)
+    if not rows:
+        print("No series with provenance from two or more shards.")
+        return
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        for record in rows:
+            writer.writerow({k: (f"{v:.6g}" if isinstance(v, float) else v) for k, v in record.items()})
+    print(f"{sum(r['shifted'] for r in rows)} of {len(rows)} shard samples shifted; table written to {args.output}")
+    for s in session_summary(rows):
+        flag = "FLAGGED" if s['flagged'] else ""
+        print(f"  {s['solution']:<12}{s['shard']:<26}{s['shifted']:>4}/{s['benchmarks']:<4}"
+              f"delta {s['median_delta']:+.2f}  {flag}")
+
+if __name__ == "__main__":
+    main()
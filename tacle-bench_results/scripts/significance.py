@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Statistical comparison of Preempt-RT and ZIC-APU for every (benchmark,
+configuration) pair measured on both solutions.
+
+For each pair it runs a Mann-Whitney U test (normal approximation with tie
+correction) and a two-sample Kolmogorov-Smirnov test, and computes
+bootstrap confidence intervals for the difference of the medians and of the
+p99. The bootstrap resamples of a batch of pairs are drawn as one NumPy
+index array, so there is no Python loop per resample; batches are sized so
+that this array never exceeds bootstrap_cells elements. p-values are then
+corrected for multiple comparisons and the significant differences are
+written as a ranked table. All times are in milliseconds.
+
+Example:
+    python significance.py --resamples 2000 --alpha 0.05 --correction bh
+"""
+import math
+import argparse
+import csv
+import numpy as np
+
+from pwcet import ks_2samp_rows, normal_sf
+from sample_store import configurations, load_samples, ns_to_ms, solutions
+from tail_stats import pad_series
+
+# Table written by default, next to the solution directories.
+default_output = '../significance.csv'
+
+# Elements of one (rows, resamples, width) resample array, about 128 MiB of float64.
+# Caps the peak memory of the bootstrap whatever the series lengths.
+bootstrap_cells = 1 << 24
+
+def paired_series(data, sol_a, sol_b):
+    """Keys and ms arrays of the (benchmark, configuration) pairs present in both solutions."""
+    keys, series_a, series_b = [], [], []
+    for config in configurations:
+        benches_a = data[sol_a].get(config, {})
+        benches_b = data[sol_b].get(config, {})
+        for bench in sorted(set(benches_a) & set(benches_b)):
+            if len(benches_a[bench]) and len(benches_b[bench]):
+                keys.append((bench, config))
+                series_a.append(ns_to_ms(benches_a[bench]))
+                series_b.append(ns_to_ms(benches_b[bench]))
+    return keys, series_a, series_b
+
+def mann_whitney_rows(a, b):
+    """Two-sided Mann-Whitney U p-value for every row pair of NaN-padded matrices."""
+    p_values = np.ones(len(a))
+    for row in range(len(a)):
+        x = a[row][~np.isnan(a[row])]
+        y = np.sort(b[row][~np.isnan(b[row])])
+        n1, n2 = len(x), len(y)
+        below = np.searchsorted(y, x, side='left')
+        equal = np.searchsorted(y, x, side='right') - below
+        u = below.sum() + 0.5 * equal.sum()
+        _, ties = np.unique(np.concatenate([x, y]), return_counts=True)
+        n = n1 + n2
+        variance = n1 * n2 / 12 * ((n + 1) - (ties ** 3 - ties).sum() / (n * (n - 1)))
+        if variance > 0:
+            # Continuity correction of 0.5 towards the mean.
+            z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+            p_values[row] = min(1.0, normal_sf(max(z, 0.0)))
+    return p_values
+
+def row_quantile(sorted_values, counts, q):
+    """Linear-interpolation quantile q along the last axis of NaN-padded sorted arrays."""
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    weight = position - lower
+    low = np.take_along_axis(sorted_values, lower[..., None], axis=-1)[..., 0]
+    high = np.take_along_axis(sorted_values, upper[..., None], axis=-1)[..., 0]
+    return low + weight * (high - low)
+
+def bootstrap_batches(counts, resamples):
+    """
+    Consecutive row slices whose resample arrays fit in bootstrap_cells.
+    A row too long to share a batch gets a slice of its own.
+    """
+    start, width = 0, 0
+    for row, count in enumerate(counts):
+        width = max(width, int(count))
+        if row > start and (row + 1 - start) * resamples * width > bootstrap_cells:
+            yield slice(start, row)
+            start, width = row, int(count)
+    if start < len(counts):
+        yield slice(start, len(counts))
+
+def bootstrap_statistics(matrix, counts, resamples, rng):
+    """
+    Medians and p99 of `resamples` bootstrap resamples of every row.
+    Resamples are drawn in chunks of at most bootstrap_cells elements.
+    Returns two arrays of shape (rows, resamples).
+    """
+    rows = len(matrix)
+    width = max(int(counts.max()), 1) if rows else 1
+    # Padding beyond the longest row of this batch is never indexed.
+    matrix = matrix[:, :width]
+    chunk = max(1, bootstrap_cells // max(rows * width, 1))
+    medians = np.empty((rows, resamples))
+    p99 = np.empty((rows, resamples))
+    for start in range(0, resamples, chunk):
+        drawn = slice(start, min(start + chunk, resamples))
+        size = drawn.stop - drawn.start
+        # One index matrix for all rows of the chunk; indices are drawn within each row's count.
+        index = (rng.random((rows, size, width)) * counts[:, None, None]).astype(np.int64)
+        resampled = np.take_along_axis(matrix[:, None, :], index, axis=2)
+        # Padding slots sort after every real sample and are never selected by row_quantile.
+        np.copyto(resampled, np.inf, where=np.arange(width) >= counts[:, None, None])
+        resampled.sort(axis=2)
+        n = np.broadcast_to(counts[:, None], (rows, size))
+        medians[:, drawn] = row_quantile(resampled, n, 0.5)
+        p99[:, drawn] = row_quantile(resampled, n, 0.99)
+    return medians, p99
+
+def bootstrap_differences(a, b, resamples, confidence, rng):
+    """Percentile CIs of median(b) - median(a) and p99(b) - p99(a) for every row pair."""
+    counts_a = np.count_nonzero(~np.isnan(a), axis=1)
+    counts_b = np.count_nonzero(~np.isnan(b), axis=1)
+    tail = (1 - confidence) / 2 * 100
+    median_ci = np.empty((len(a), 2))
+    p99_ci = np.empty((len(a), 2))
+    for batch in bootstrap_batches(np.maximum(counts_a, counts_b), resamples):
+        median_a, p99_a = bootstrap_statistics(a[batch], counts_a[batch], resamples, rng)
+        median_b, p99_b = bootstrap_statistics(b[batch], counts_b[batch], resamples, rng)
+        median_ci[batch] = np.percentile(median_b - median_a, [tail, 100 - tail], axis=1).T
+        p99_ci[batch] = np.percentile(p99_b - p99_a, [tail, 100 - tail], axis=1).T
+    return median_ci, p99_ci
+
+def adjust_p_values(p_values, method):
+    """Holm (FWER) or Benjamini-Hochberg (FDR) adjusted p-values."""
+    p_values = np.asarray(p_values, dtype=float)
+    m = len(p_values)
+    order = np.argsort(p_values)
+    ranked = p_values[order]
+    if method == 'holm':
+        adjusted = np.maximum.accumulate(np.minimum(1.0, (m - np.arange(m)) * ranked))
+    else:
+        adjusted = np.minimum.accumulate((m / np.arange(m, 0, -1) * ranked[::-1]))[::-1]
+        adjusted = np.minimum(1.0, adjusted)
+    result = np.empty(m)
+    result[order] = adjusted
+    return result
+
+def compare_solutions(data, sol_a, sol_b, resamples=2000, confidence=0.95, alpha=0.05,
+                      correction='bh', seed=0):
+    """Returns one row dict per (benchmark, configuration) pair, ranked by effect size."""
+    keys, series_a, series_b = paired_series(data, sol_a, sol_b)
+    if not keys:
+        return []
+    a = pad_series(series_a)
+    b = pad_series(series_b)
+    p_mw = mann_whitney_rows(a, b)
+    p_ks = ks_2samp_rows(a, b)
+    median_ci, p99_ci = bootstrap_differences(a, b, resamples, confidence, np.random.default_rng(seed))
+    p_mw_adj = adjust_p_values(p_mw, correction)
+    p_ks_adj = adjust_p_values(p_ks, correction)
+
+    median_a = np.nanmedian(a, axis=1)
+    median_b = np.nanmedian(b, axis=1)
+    relative = (median_b - median_a) / median_a
+
+    rows = []
+    for i, (bench, config) in enumerate(keys):
+        significant = p_mw_adj[i] < alpha
+        if significant:
+            verdict = f"{sol_a} faster" if relative[i] > 0 else f"{sol_b} faster"
+        else:
+            verdict = "no significant difference"
+        rows.append({
+            'benchmark': bench,
+            'configuration': config,
+            f"median_{sol_a}": median_a[i],
+            f"median_{sol_b}": median_b[i],
+            'relative_median_diff': relative[i],
+            'median_diff_ci_low': median_ci[i, 0],
+            'median_diff_ci_high': median_ci[i, 1],
+            'p99_diff_ci_low': p99_ci[i, 0],
+            'p99_diff_ci_high': p99_ci[i, 1],
+            'p_mannwhitney': p_mw[i],
+            'p_mannwhitney_adj': p_mw_adj[i],
+            'p_ks': p_ks[i],
+            'p_ks_adj': p_ks_adj[i],
+            'significant': significant,
+            'verdict': verdict,
+        })
+    rows.sort(key=lambda r: (not r['significant'], -abs(r['relative_median_diff'])))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Test whether Preempt-RT and ZIC-APU differ.")
+    parser.add_argument('--resamples', type=int, default=2000, help="bootstrap resamples per pair")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level of the CIs")
+    parser.add_argument('--alpha', type=float, default=0.05, help="significance level after correction")
+    parser.add_argument('--correction', choices=['bh', 'holm'], default='bh',
+                        help="multiple-comparison correction (Benjamini-Hochberg or Holm)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the bootstrap generator")
+    parser.add_argument('--output', default=default_output, help="CSV file to write")
+    args = parser.parse_args()
+
+    sol_a, sol_b = list(solutions)[:2]
+    rows = compare_solutions(load_samples(solutions), sol_a, sol_b, args.resamples,
+                             args.confidence, args.alpha, args.correction, args.seed)
+    if not rows:
+        print("No (benchmark, configuration) pair measured on both solutions.")
+        return
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        for record in rows:
+            writer.writerow({k: (f"{v:.6g}" if isinstance(v, float) else v) for k, v in record.items()})
+
+    significant = [r for r in rows if r['significant']]
+    print(f"{len(significant)} of {len(rows)} pairs differ significantly "
+          f"({args.correction}, alpha={args.alpha}); table written to {args.output}")
+    for r in significant[:20]:
+        print(f"  {r['benchmark']:<16}{r['configuration']:<10}{r['relative_median_diff']:+8.1%}  {r['verdict']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Mergeable quantile sketches (DDSketch) of the execution times, for
+campaigns too long to keep or sort every sample.
+
+A sketch counts each sample in a logarithmic bucket, ceil(log_gamma(x)) with
+gamma = (1 + a) / (1 - a), so any quantile read from it is within a relative
+error a (relative_accuracy) of the exact one, whatever the distribution.
+Count, sum, sum of squares, minimum and maximum are kept besides, so the
+mean, standard deviation and extremes stay exact. Only the non-empty buckets
+are stored, as (key, count) pairs, so the size of a sketch follows the number
+of distinct bucketed values, never the span between the extremes nor the
+number of samples. Two sketches of the same accuracy merge exactly (their
+bucket counts add), so shards, boards or days can be summarized apart and
+combined.
+
+The sketch of <configuration>/<benchmark>_results.txt is saved next to it as
+<benchmark>_sketch.npz. ingest.py folds every appended batch into it, and a
+sketch older than its results file is rebuilt by streaming the file in
+blocks. The stats stage and the box, violin and CDF plots of graph.py can
+run from sketches alone (cli.py stats/plot --from-sketches). Sketch values
+are returned in milliseconds like the rest of the analysis.
+
+Examples:
+    python sketch.py                       # build or refresh every sketch
+    python sketch.py --merge ../ZIC-APU ../ZIC-APU-board2 --output ../ZIC-APU-merged
+"""
+import os
+import glob
+import math
+import argparse
+import numpy as np
+
+from density import binned_kde, kde_grid_points
+from sample_store import (discover_configurations, find_benchmark_files, parse_execution_times_checked,
+                          sample_suffixes, solutions)
+
+# Relative error bound of every quantile read from a sketch. The jitter of a
+# benchmark is often well under 1% of its execution time, so the buckets must
+# be much narrower than that for the box and violin plots to show it.
+relative_accuracy = 1e-4
+
+# Suffix of the sketch files written next to the sample files.
+sketch_suffix = '_sketch.npz'
+
+# Sample files are folded into a sketch in blocks of this size.
+block_size = 1 << 22
+
+class QuantileSketch:
+    """
+    DDSketch of int64 nanosecond samples. Buckets are stored sparse: sorted
+    keys of the non-empty buckets and their counts; samples <= 0 are counted apart.
+    """
+    def __init__(self, alpha=relative_accuracy):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+        # Exact integer sum (Python int); the sum of squares only feeds the standard deviation.
+        self.total = 0
+        self.total_squares = 0.0
+        self.min_ns = None
+        self.max_ns = None
+
+    def __len__(self):
+        return self.count
+
+    def add_buckets(self, keys, counts):
+        """Adds counts to the buckets of the given keys, creating the missing ones."""
+        if not len(self.keys):
+            self.keys, self.counts = keys, counts
+            return
+        self.keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        merged = np.zeros(len(self.keys), dtype=np.int64)
+        np.add.at(merged, inverse, np.concatenate([self.counts, counts]))
+        self.counts = merged
+
+    def add(self, exec_times):
+        """Adds an int64 ns array."""
+        exec_times = np.asarray(exec_times, dtype=np.int64)
+        if not exec_times.size:
+            return
+        positive = exec_times[exec_times > 0]
+        self.zero_count += exec_times.size - positive.size
+        if positive.size:
+            keys = np.ceil(np.log(positive) / math.log(self.gamma)).astype(np.int64)
+            self.add_buckets(*np.unique(keys, return_counts=True))
+        self.count += exec_times.size
+        self.total += int(exec_times.sum())
+        self.total_squares += float(np.square(exec_times, dtype=np.float64).sum())
+        low, high = int(exec_times.min()), int(exec_times.max())
+        self.min_ns = low if self.min_ns is None else min(self.min_ns, low)
+        self.max_ns = high if self.max_ns is None else max(self.max_ns, high)
+
+    def merge(self, other):
+        """Adds the samples summarized by another sketch of the same accuracy; exact."""
+        if other.alpha != self.alpha:
+            raise ValueError(f"Cannot merge sketches of accuracy {self.alpha} and {other.alpha}")
+        if not other.count:
+            return self
+        if len(other.keys):
+            self.add_buckets(other.keys.copy(), other.counts.copy())
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        self.max_ns = other.max_ns if self.max_ns is None else max(self.max_ns, other.max_ns)
+        return self
+
+    def bucket_values(self):
+        """Representative value (ms) of every bucket: 2 gamma^k / (gamma + 1)."""
+        return 2 * self.gamma ** self.keys.astype(float) / (self.gamma + 1) / 1e6
+
+    def weighted_values(self):
+        """(values, counts) of the non-empty buckets in ms, with the samples <= 0 as 0."""
+        values = np.r_[0.0, self.bucket_values()]
+        counts = np.r_[self.zero_count, self.counts]
+        used = counts > 0
+        return np.clip(values[used], self.min_ns / 1e6, self.max_ns / 1e6), counts[used]
+
+    def quantile(self, q):
+        """Quantile(s) in ms, within the relative accuracy; q = 0 and 1 give the exact extremes."""
+        values, counts = self.weighted_values()
+        rank = np.asarray(q, dtype=float) * (self.count - 1)
+        result = values[np.minimum(np.searchsorted(np.cumsum(counts), rank, side='right'), len(values) - 1)]
+        result = np.where(np.asarray(q) <= 0, self.min_ns / 1e6, result)
+        result = np.where(np.asarray(q) >= 1, self.max_ns / 1e6, result)
+        return result if result.ndim else float(result)
+
+    def cdf_points(self):
+        """(values, cumulative probabilities) at every non-empty bucket; the last point is the exact maximum."""
+        values, counts = self.weighted_values()
+        values[-1] = self.max_ns / 1e6
+        return values, np.cumsum(counts) / self.count
+
+    def std_ns(self):
+        mean = self.total / self.count
+        return math.sqrt(max(self.total_squares / self.count - mean ** 2, 0.0))
+
+    def statistics(self):
+        """Summary statistics (ms) like stats_cache.calculate_statistics; the median is approximate."""
+        return {
+            'count': int(self.count),
+            'mean': self.total / self.count / 1e6,
+            'median': self.quantile(0.5),
+            'std_dev': self.std_ns() / 1e6,
+            'min': self.min_ns / 1e6,
+            'max': self.max_ns / 1e6,
+        }
+
+    def density_curve(self, grid_points=kde_grid_points):
+        """
+        KDE curve (see density.binned_kde) of the bucket values weighted by
+        their counts. Scott's bandwidth comes from the exact standard deviation
+        and is at least half a bucket around the median, so the curve does not
+        resolve the bucket grid itself.
+        """
+        values, counts = self.weighted_values()
+        bandwidth = max(self.std_ns() / 1e6 * self.count ** (-1 / 5), self.quantile(0.5) * self.alpha, 1e-9)
+        return binned_kde(values, grid_points, weights=counts, bandwidth=bandwidth)
+
+    def box_stats(self, whisker=1.5):
+        """Box plot statistics for Axes.bxp: quartiles, 1.5 IQR whiskers, buckets beyond them as fliers."""
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        values, _ = self.weighted_values()
+        inside = values[(values >= q1 - whisker * (q3 - q1)) & (values <= q3 + whisker * (q3 - q1))]
+        low, high = (inside.min(), inside.max()) if inside.size else (q1, q3)
+        return {'med': median, 'q1': q1, 'q3': q3, 'whislo': min(low, q1), 'whishi': max(high, q3),
+                'fliers': values[(values < low) | (values > high)], 'mean': self.total / self.count / 1e6}
+
+    def to_arrays(self):
+        return {
+            'alpha': np.array(self.alpha),
+            'keys': self.keys,
+            'counts': self.counts,
+            # The totals are stored as text: the integer sum can outgrow int64.
+            'totals': np.array(f"{self.total} {self.total_squares!r}"),
+            'extremes': np.array([self.zero_count, self.count,
+                                  -1 if self.min_ns is None else self.min_ns,
+                                  -1 if self.max_ns is None else self.max_ns], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        sketch = cls(float(arrays['alpha']))
+        sketch.keys = np.array(arrays['keys'], dtype=np.int64)
+        sketch.counts = np.array(arrays['counts'], dtype=np.int64)
+        total, total_squares = str(arrays['totals']).split()
+        sketch.total, sketch.total_squares = int(total), float(total_squares)
+        sketch.zero_count, sketch.count, min_ns, max_ns = (int(v) for v in arrays['extremes'])
+        if sketch.count:
+            sketch.min_ns, sketch.max_ns = min_ns, max_ns
+        return sketch
+
+def sketch_path(sample_file):
+    """<benchmark>_sketch.npz next to <benchmark>_results.txt (or _execution_time.txt)."""
+    for suffix in sample_suffixes:
+        if sample_file.endswith(suffix):
+            return sample_file[:-len(suffix)] + sketch_suffix
+    return os.path.splitext(sample_file)[0] + sketch_suffix
+
+def save_sketch(path, sketch, source_stat=None):
+    """Writes a sketch; source_stat is the stat of the sample file it summarizes, if any."""
+    source = [-1, -1] if source_stat is None else [source_stat.st_size, source_stat.st_mtime_ns]
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, source=np.array(source, dtype=np.int64), **sketch.to_arrays())
+    os.replace(tmp_path, path)
+
+def load_sketch(path, source_stat=None):
+    """
+    Reads a sketch file; with source_stat, only if it was written for a
+    sample file of that size and mtime. Returns None otherwise.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as arrays:
+            if source_stat is not None and list(arrays['source']) != [source_stat.st_size,
+                                                                      source_stat.st_mtime_ns]:
+                return None
+            return QuantileSketch.from_arrays(arrays)
+    except (KeyError, ValueError):
+        print(f"Ignoring unreadable sketch {path}")
+        return None
+
+def sketch_file(file_path, alpha=relative_accuracy):
+    """Folds a sample file into a new sketch, block by block; memory does not grow with the file."""
+    sketch = QuantileSketch(alpha)
+    carry = b''
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            block = carry + block
+            end = block.rfind(b'\n') + 1
+            carry = block[end:]
+            sketch.add(parse_execution_times_checked(block[:end], file_path))
+    if carry.strip():
+        sketch.add(parse_execution_times_checked(carry, file_path))
+    return sketch
+
+def file_sketch(file_path):
+    """The sketch of a sample file, rebuilt and saved when it is missing, stale or of another accuracy."""
+    st = os.stat(file_path)
+    path = sketch_path(file_path)
+    sketch = load_sketch(path, st)
+    if sketch is None or sketch.alpha != relative_accuracy:
+        sketch = sketch_file(file_path)
+        save_sketch(path, sketch, st)
+    return sketch
+
+def append_to_sketch(file_path, previous_stat, exec_times):
+    """
+    Folds samples just appended to a sample file into its sketch. The sketch
+    must match the file as it was before the append (previous_stat, None for
+    a new file); otherwise the whole file is summarized again.
+    """
+    path = sketch_path(file_path)
+    sketch = QuantileSketch() if previous_stat is None else load_sketch(path, previous_stat)
+    if sketch is None or sketch.alpha != relative_accuracy:
+        sketch = sketch_file(file_path)
+    else:
+        sketch.add(exec_times)
+    save_sketch(path, sketch, os.stat(file_path))
+
+def sketch_configurations(solution_dir):
+    """
+    Configurations of a solution (see discover_configurations), followed by
+    the folders holding only sketch files, such as merged solutions.
+    """
+    found = discover_configurations(solution_dir)
+    sketch_dirs = {os.path.basename(os.path.dirname(path))
+                   for path in glob.glob(os.path.join(solution_dir, '*', f"*{sketch_suffix}"))}
+    return found + sorted(sketch_dirs - set(found))
+
+def solution_sketches(solution_dir, configs=None):
+    """
+    Returns data[configuration][benchmark] = sketch for one solution. Sample
+    files are summarized when their sketch is stale; sketches without a
+    sample file (e.g. merged ones) are used as they are.
+    """
+    data = {}
+    for config in configs or sketch_configurations(solution_dir):
+        data[config] = {bench: file_sketch(file_path)
+                        for bench, file_path in find_benchmark_files(solution_dir, config).items()}
+        for path in sorted(glob.glob(os.path.join(solution_dir, config, f"*{sketch_suffix}"))):
+            bench = os.path.basename(path)[:-len(sketch_suffix)]
+            if bench not in data[config]:
+                sketch = load_sketch(path)
+                if sketch is not None:
+                    data[config][bench] = sketch
+        data[config] = {bench: s for bench, s in data[config].items() if s.count}
+    return data
+
+def merge_solutions(solution_dirs, output_dir, configs=None):
+    """
+    Merges the sketches of the same (configuration, benchmark) of several
+    solution directories (boards, or campaigns split in parts) into
+    <output_dir>/<configuration>/<benchmark>_sketch.npz. Returns the number
+    of sketches written.
+    """
+    merged = {}
+    for solution_dir in solution_dirs:
+        for config, benches in solution_sketches(solution_dir, configs).items():
+            for bench, sketch in benches.items():
+                if (config, bench) in merged:
+                    merged[config, bench].merge(sketch)
+                else:
+                    merged[config, bench] = sketch
+    for (config, bench), sketch in merged.items():
+        os.makedirs(os.path.join(output_dir, config), exist_ok=True)
+        save_sketch(os.path.join(output_dir, config, f"{bench}{sketch_suffix}"), sketch)
+    return len(merged)
+
+def draw_sketch_boxes(ax, sketches, width=0.8):
+    """Box plot of a list of sketches, one box per position like seaborn's boxplot."""
+    artists = ax.bxp([s.box_stats() for s in sketches], positions=range(len(sketches)),
+                     widths=width * 0.8, patch_artist=True, showfliers=True)
+    for idx, box in enumerate(artists['boxes']):
+        box.set_facecolor(f"C{idx}")
+        box.set_alpha(0.8)
+    for median in artists['medians']:
+        median.set_color('k')
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, refresh or merge the quantile sketches.")
+    parser.add_argument('--merge', nargs='+', metavar='SOLUTION_DIR',
+                        help="merge the sketches of these solution directories")
+    parser.add_argument('--output', help="directory receiving the merged sketches (with --merge)")
+    args = parser.parse_args()
+
+    if args.merge:
+        if not args.output:
+            parser.error("--merge needs --output")
+        written = merge_solutions(args.merge, args.output)
+        print(f"{written} merged sketches written to {args.output}")
+        return
+    for sol_name, sol_dir in solutions.items():
+        data = solution_sketches(sol_dir)
+        n_sketches = sum(len(benches) for benches in data.values())
+        n_samples = sum(s.count for benches in data.values() for s in benches.values())
+        n_bytes = sum(s.keys.nbytes + s.counts.nbytes for benches in data.values() for s in benches.values())
+        print(f"{sol_name}: {n_sketches} sketches of {n_samples} samples, {n_bytes / 1024:.0f} KiB of buckets")
+
+if __name__ == "__main__":
+    main()
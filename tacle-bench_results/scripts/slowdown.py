@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Interference slowdown of every benchmark under every stressor, relative to
+its own baseline, for each solution.
+
+Median, p99 and max of all series are computed in one batched pass
+(see tail_stats.py) and divided by the baseline values of the same
+solution and benchmark. The script writes the full matrix as a CSV, prints
+the most interference-sensitive benchmarks and renders one heatmap per
+solution plus a Preempt-RT minus ZIC-APU difference heatmap.
+
+Example:
+    python slowdown.py --metric p99 --top 10
+"""
+import os
+import argparse
+import csv
+import numpy as np
+
+from sample_store import configurations, load_samples, solutions
+from tail_stats import compute_tail_stats
+
+# Stressor configurations compared against the baseline.
+stressors = [c for c in configurations if c != 'baseline']
+
+# Slowdown metrics and the tail_stats column each of them is computed from.
+metrics = {'median': 'median', 'p99': 'p99', 'max': 'wcet'}
+
+# Default outputs, next to the solution directories.
+default_output = '../slowdown.csv'
+default_plots_dir = '../slowdown_plots'
+
+def slowdown_matrix(data):
+    """
+    Returns (benchmarks, ratios) where ratios[solution][metric] is an array of
+    shape (len(benchmarks), len(stressors)); missing cells are NaN.
+    """
+    rows = compute_tail_stats(data, percentiles=(99,))
+    benchmarks = sorted({r['benchmark'] for r in rows})
+    bench_index = {b: i for i, b in enumerate(benchmarks)}
+    config_index = {c: i for i, c in enumerate(['baseline'] + stressors)}
+
+    ratios = {}
+    for sol_name in data:
+        values = {m: np.full((len(benchmarks), len(config_index)), np.nan) for m in metrics}
+        for r in rows:
+            if r['solution'] == sol_name and r['configuration'] in config_index:
+                for metric, column in metrics.items():
+                    values[metric][bench_index[r['benchmark']], config_index[r['configuration']]] = r[column]
+        ratios[sol_name] = {m: v[:, 1:] / v[:, :1] for m, v in values.items()}
+    return benchmarks, ratios
+
+def rank_sensitive(benchmarks, ratio, top):
+    """Benchmarks sorted by their worst slowdown over all stressors."""
+    worst = np.nanmax(np.where(np.isnan(ratio), -np.inf, ratio), axis=1)
+    order = np.argsort(-worst)
+    return [(benchmarks[i], stressors[int(np.nanargmax(np.where(np.isnan(ratio[i]), -np.inf, ratio[i])))],
+             worst[i]) for i in order[:top] if np.isfinite(worst[i])]
+
+def write_table(benchmarks, ratios, output_path):
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['solution', 'benchmark', 'stressor'] + [f"{m}_slowdown" for m in metrics])
+        for sol_name, sol_ratios in ratios.items():
+            for i, bench in enumerate(benchmarks):
+                for j, stressor in enumerate(stressors):
+                    cells = [sol_ratios[m][i, j] for m in metrics]
+                    if not np.all(np.isnan(cells)):
+                        writer.writerow([sol_name, bench, stressor] + [f"{v:.6f}" for v in cells])
+
+def plot_heatmap(matrix, benchmarks, title, save_path, diverging=False):
+    """Draws a benchmarks x stressors heatmap with the value written in each cell."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import TwoSlopeNorm
+
+    keep = ~np.all(np.isnan(matrix), axis=1)
+    matrix = matrix[keep]
+    labels = [b for b, k in zip(benchmarks, keep) if k]
+    if not labels:
+        print(f"No slowdown to draw in {save_path}")
+        return
+    fig, ax = plt.subplots(figsize=(8, 0.28 * len(labels) + 2))
+    if diverging:
+        limit = max(np.nanmax(np.abs(matrix)), 1e-6)
+        image = ax.imshow(matrix, aspect='auto', cmap='RdBu_r', norm=TwoSlopeNorm(0, -limit, limit))
+    else:
+        image = ax.imshow(matrix, aspect='auto', cmap='viridis', vmin=min(1.0, np.nanmin(matrix)))
+    for (i, j), value in np.ndenumerate(matrix):
+        if not np.isnan(value):
+            # Dark text on light cells and vice versa.
+            r, g, b, _ = image.cmap(image.norm(value))
+            color = 'k' if 0.299 * r + 0.587 * g + 0.114 * b > 0.5 else 'w'
+            ax.text(j, i, f"{value:.2f}", ha='center', va='center', fontsize=6, color=color)
+    ax.set_xticks(range(len(stressors)))
+    ax.set_xticklabels(stressors)
+    ax.set_yticks(range(len(labels)))
+    ax.set_yticklabels(labels, fontsize=7)
+    ax.set_xlabel("Stressor")
+    ax.set_title(title)
+    fig.colorbar(image, ax=ax)
+    fig.tight_layout()
+    fig.savefig(save_path)
+    plt.close(fig)
+    print(f"Heatmap saved to {save_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute and plot interference slowdowns.")
+    parser.add_argument('--metric', choices=list(metrics), default='median',
+                        help="slowdown metric used for ranking and heatmaps")
+    parser.add_argument('--top', type=int, default=10, help="number of sensitive benchmarks to list")
+    parser.add_argument('--output', default=default_output, help="CSV file to write")
+    parser.add_argument('--plots-dir', default=default_plots_dir, help="directory for the heatmaps")
+    parser.add_argument('--no-plots', action='store_true', help="only write the table and ranking")
+    args = parser.parse_args()
+
+    benchmarks, ratios = slowdown_matrix(load_samples(solutions))
+    if not benchmarks:
+        print("No samples found.")
+        return
+    write_table(benchmarks, ratios, args.output)
+    print(f"Slowdown matrix written to {args.output}")
+
+    for sol_name, sol_ratios in ratios.items():
+        print(f"\nMost interference-sensitive benchmarks on {sol_name} ({args.metric}):")
+        for bench, stressor, ratio in rank_sensitive(benchmarks, sol_ratios[args.metric], args.top):
+            print(f"  {bench:<16}{stressor:<10}x{ratio:.3f}")
+
+    if args.no_plots:
+        return
+    os.makedirs(args.plots_dir, exist_ok=True)
+    for sol_name, sol_ratios in ratios.items():
+        plot_heatmap(sol_ratios[args.metric], benchmarks,
+                     f"{sol_name}: {args.metric} slowdown vs baseline",
+                     os.path.join(args.plots_dir, f"{sol_name}_{args.metric}_slowdown.png"))
+    names = list(ratios)
+    if len(names) == 2:
+        difference = ratios[names[0]][args.metric] - ratios[names[1]][args.metric]
+        plot_heatmap(difference, benchmarks,
+                     f"{names[0]} minus {names[1]}: {args.metric} slowdown",
+                     os.path.join(args.plots_dir, f"difference_{args.metric}_slowdown.png"), diverging=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+from sample_store import configurations, find_benchmark_files, ns_to_ms, parse_execution_times_checked
+
+# Cache of per-file statistics written inside each solution directory.
+cache_filename = 'stats_cache.json'
+
+def calculate_statistics(execution_times):
+    """Summary statistics of an ms array."""
+    return {
+        'count': int(len(execution_times)),
+        'mean': float(np.mean(execution_times)),
+        'median': float(np.median(execution_times)),
+        'std_dev': float(np.std(execution_times)),
+        'min': float(np.min(execution_times)),
+        'max': float(np.max(execution_times)),
+    }
+
+def load_cache(solution_dir):
+    path = os.path.join(solution_dir, cache_filename)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        print(f"Ignoring unreadable stats cache {path}")
+        return {}
+
+def save_cache(solution_dir, cache):
+    path = os.path.join(solution_dir, cache_filename)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def file_statistics(file_path, entry):
+    """
+    Returns (stats, entry) for one sample file. The file is not opened when
+    its size and mtime match the cached entry; when only the mtime changed,
+    the content hash decides whether the cached stats are still valid.
+    The sample file itself is only ever read.
+    """
+    st = os.stat(file_path)
+    if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+        return entry['stats'], entry
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha1(content).hexdigest()
+    if entry and entry['sha1'] == digest:
+        stats = entry['stats']
+    else:
+        execution_times = parse_execution_times_checked(content, file_path)
+        stats = calculate_statistics(ns_to_ms(execution_times)) if execution_times.size else None
+    return stats, {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': digest, 'stats': stats}
+
+def cached_statistics(solution_dir, configs=None):
+    """
+    Returns stats[configuration][benchmark] (ms) for one solution, computing
+    only the files that changed since the cache was last written.
+    """
+    cache = load_cache(solution_dir)
+    new_cache = {}
+    stats = {}
+    recomputed = 0
+    for config in configs or configurations:
+        stats[config] = {}
+        for bench, file_path in find_benchmark_files(solution_dir, config).items():
+            key = os.path.relpath(file_path, solution_dir)
+            file_stats, entry = file_statistics(file_path, cache.get(key))
+            recomputed += entry is not cache.get(key)
+            new_cache[key] = entry
+            if file_stats is not None:
+                stats[config][bench] = file_stats
+            else:
+                print(f"No valid execution times found in {file_path}.")
+    # Entries of other configurations are kept so that a filtered run does not evict them.
+    for key, entry in cache.items():
+        new_cache.setdefault(key, entry)
+    if recomputed or new_cache.keys() != cache.keys():
+        save_cache(solution_dir, new_cache)
+    return stats
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tail-latency and WCET statistics for every (solution, configuration,
+benchmark), computed in one batched NumPy pass and written to a single CSV.
+
+For each series it reports count, mean, std, min, median, the requested high
+percentiles, the observed WCET (max), the WCET/median ratio, how many
+samples exceed a threshold, and high-water marks (how many times the running
+maximum was raised and at which sample index the WCET was first observed).
+With trim_warmup, the warm-up prefix detected by changepoint.py is dropped
+from every series first. All times are in milliseconds.
+
+Example:
+    python tail_stats.py --percentiles 99 99.9 --exceed-factor 1.05
+"""
+import argparse
+import csv
+import numpy as np
+
+from sample_store import load_samples, ns_to_ms, solutions
+
+# Summary table written by default, next to the solution directories.
+default_output = '../tail_stats.csv'
+
+def pad_series(series):
+    """Stacks variable-length ms arrays into a NaN-padded 2D matrix."""
+    width = max((len(s) for s in series), default=0)
+    matrix = np.full((len(series), width), np.nan)
+    for row, exec_times in enumerate(series):
+        matrix[row, :len(exec_times)] = exec_times
+    return matrix
+
+def collect_series(data):
+    """Flattens data[solution][configuration][benchmark] into keys and ms arrays."""
+    keys = []
+    series = []
+    for sol_name, sol_data in data.items():
+        for config, benches in sol_data.items():
+            for bench, exec_times in sorted(benches.items()):
+                if len(exec_times):
+                    keys.append((sol_name, config, bench))
+                    series.append(ns_to_ms(exec_times))
+    return keys, series
+
+def compute_tail_stats(data, percentiles=(99, 99.9), exceed_factor=1.1, threshold_ms=None,
+                       trim_warmup=False):
+    """
+    Returns one row dict per (solution, configuration, benchmark).
+    The exceedance threshold is threshold_ms if given, otherwise exceed_factor
+    times the baseline median of the same solution and benchmark (or of the
+    series itself when there is no baseline).
+    """
+    keys, series = collect_series(data)
+    if not keys:
+        return []
+    warmup = np.zeros(len(keys), dtype=np.int64)
+    if trim_warmup:
+        # Imported here: changepoint.py itself builds on this module.
+        from changepoint import trim_warmup as trim
+        trimmed = trim(series)
+        warmup = np.array([len(s) - len(t) for s, t in zip(series, trimmed)])
+        series = trimmed
+    matrix = pad_series(series)
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+
+    mean = np.nanmean(matrix, axis=1)
+    std = np.nanstd(matrix, axis=1)
+    minimum = np.nanmin(matrix, axis=1)
+    maximum = np.nanmax(matrix, axis=1)
+    quantiles = np.nanpercentile(matrix, [50, *percentiles], axis=1)
+    median = quantiles[0]
+
+    # High-water marks: running maximum along the sample order.
+    running_max = np.fmax.accumulate(np.where(valid, matrix, -np.inf), axis=1)
+    hwm_updates = 1 + np.count_nonzero(np.diff(running_max, axis=1) > 0, axis=1)
+    wcet_index = np.argmax(np.where(valid, matrix, -np.inf), axis=1)
+
+    if threshold_ms is not None:
+        thresholds = np.full(len(keys), float(threshold_ms))
+    else:
+        baseline_median = {(sol, bench): median[row] for row, (sol, config, bench) in enumerate(keys)
+                           if config == 'baseline'}
+        thresholds = exceed_factor * np.array([baseline_median.get((sol, bench), median[row])
+                                               for row, (sol, config, bench) in enumerate(keys)])
+    exceed_counts = np.count_nonzero(matrix > thresholds[:, None], axis=1)
+
+    rows = []
+    for row, (sol_name, config, bench) in enumerate(keys):
+        record = {
+            'solution': sol_name,
+            'configuration': config,
+            'benchmark': bench,
+            'count': int(counts[row]),
+            'warmup_trimmed': int(warmup[row]),
+            'mean': mean[row],
+            'std_dev': std[row],
+            'min': minimum[row],
+            'median': median[row],
+        }
+        for p, values in zip(percentiles, quantiles[1:]):
+            record[f"p{p:g}"] = values[row]
+        record.update({
+            'wcet': maximum[row],
+            'wcet_median_ratio': maximum[row] / median[row],
+            'threshold': thresholds[row],
+            'exceed_count': int(exceed_counts[row]),
+            'exceed_fraction': exceed_counts[row] / counts[row],
+            'hwm_updates': int(hwm_updates[row]),
+            'wcet_sample_index': int(wcet_index[row]),
+        })
+        rows.append(record)
+    return rows
+
+def write_table(rows, output_path):
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        for record in rows:
+            writer.writerow({k: (f"{v:.6f}" if isinstance(v, float) else v) for k, v in record.items()})
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute tail-latency and WCET statistics.")
+    parser.add_argument('--percentiles', type=float, nargs='+', default=[99, 99.9],
+                        help="high percentiles to report")
+    parser.add_argument('--exceed-factor', type=float, default=1.1,
+                        help="exceedance threshold as a multiple of the baseline median")
+    parser.add_argument('--threshold-ms', type=float,
+                        help="absolute exceedance threshold in ms (overrides --exceed-factor)")
+    parser.add_argument('--trim-warmup', action='store_true',
+                        help="drop the detected warm-up prefix of every series first")
+    parser.add_argument('--output', default=default_output, help="CSV file to write")
+    args = parser.parse_args()
+
+    data = load_samples(solutions)
+    rows = compute_tail_stats(data, args.percentiles, args.exceed_factor, args.threshold_ms,
+                              args.trim_warmup)
+    if not rows:
+        print("No samples found.")
+        return
+    write_table(rows, args.output)
+    print(f"Tail statistics for {len(rows)} series written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+import numpy as np
+
+import compare_graphs
+from render_pool import render_all
+
+def test_every_plot_type_renders(tmp_path):
+    configs = ['baseline', 'cpu8']
+    sols = {'Preempt-RT': str(tmp_path / 'Preempt-RT'), 'ZIC-APU': str(tmp_path / 'ZIC-APU')}
+    compare_graphs.set_solutions(sols, configs, str(tmp_path / 'compare_plots'))
+    for folder in compare_graphs.plot_types.values():
+        os.makedirs(folder)
+    rng = np.random.default_rng(0)
+    bench_data = {'bitcount': {config: {sol: rng.normal(1.0, 0.01, 200) for sol in sols} for config in configs}}
+
+    errors = render_all('bitcount', compare_graphs.plot_functions.values(), bench_data)
+
+    assert errors == {}
+    for plot_type, folder in compare_graphs.plot_types.items():
+        assert os.path.exists(os.path.join(folder, f"bitcount_{plot_type}.png"))